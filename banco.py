@@ -0,0 +1,214 @@
+import json
+import os
+import re
+import sqlite3
+import threading
+from datetime import datetime
+
+# Banco persistente de questões (SQLite + FTS5): sobrevive a reinícios e ao "Encerrar e Limpar Sessão".
+
+# Colunas acrescentadas depois da primeira versão do banco: criadas em bancos antigos ao abrir.
+COLUNAS_NOVAS = {"assinatura": "BLOB", "estrutura": "TEXT"}
+
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS questoes (
+    id INTEGER PRIMARY KEY,
+    titulo TEXT NOT NULL,
+    area TEXT, curso TEXT, assunto TEXT, nivel_bloom TEXT, tipo TEXT, dificuldade INTEGER,
+    criado_em TEXT NOT NULL, atualizado_em TEXT NOT NULL,
+    texto_completo TEXT NOT NULL,
+    analise_qualidade TEXT,
+    contexto TEXT,
+    assinatura BLOB,
+    estrutura TEXT
+);
+CREATE INDEX IF NOT EXISTS ix_questoes_area ON questoes (area, curso);
+CREATE INDEX IF NOT EXISTS ix_questoes_curso ON questoes (curso);
+CREATE INDEX IF NOT EXISTS ix_questoes_assunto ON questoes (assunto);
+CREATE INDEX IF NOT EXISTS ix_questoes_bloom ON questoes (nivel_bloom);
+CREATE INDEX IF NOT EXISTS ix_questoes_criado ON questoes (criado_em);
+
+CREATE TABLE IF NOT EXISTS versoes (
+    id INTEGER PRIMARY KEY,
+    questao_id INTEGER NOT NULL REFERENCES questoes (id) ON DELETE CASCADE,
+    criado_em TEXT NOT NULL,
+    acao TEXT NOT NULL,
+    texto_completo TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_versoes_questao ON versoes (questao_id);
+
+CREATE TABLE IF NOT EXISTS exportacoes (
+    id INTEGER PRIMARY KEY,
+    criado_em TEXT NOT NULL,
+    formato TEXT NOT NULL,
+    filtros TEXT NOT NULL,
+    ultimo_id INTEGER NOT NULL,
+    quantidade INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_exportacoes_filtros ON exportacoes (filtros, id);
+
+CREATE VIRTUAL TABLE IF NOT EXISTS questoes_fts USING fts5(
+    titulo, assunto, texto_completo, content='questoes', content_rowid='id', tokenize='unicode61 remove_diacritics 2'
+);
+CREATE TRIGGER IF NOT EXISTS questoes_ai AFTER INSERT ON questoes BEGIN
+    INSERT INTO questoes_fts (rowid, titulo, assunto, texto_completo) VALUES (new.id, new.titulo, new.assunto, new.texto_completo);
+END;
+CREATE TRIGGER IF NOT EXISTS questoes_ad AFTER DELETE ON questoes BEGIN
+    INSERT INTO questoes_fts (questoes_fts, rowid, titulo, assunto, texto_completo) VALUES ('delete', old.id, old.titulo, old.assunto, old.texto_completo);
+END;
+CREATE TRIGGER IF NOT EXISTS questoes_au AFTER UPDATE ON questoes BEGIN
+    INSERT INTO questoes_fts (questoes_fts, rowid, titulo, assunto, texto_completo) VALUES ('delete', old.id, old.titulo, old.assunto, old.texto_completo);
+    INSERT INTO questoes_fts (rowid, titulo, assunto, texto_completo) VALUES (new.id, new.titulo, new.assunto, new.texto_completo);
+END;
+"""
+
+
+def _agora():
+    return datetime.now().isoformat(timespec="seconds")
+
+
+def _json_ou_none(valor):
+    return json.dumps(valor, ensure_ascii=False) if valor is not None else None
+
+
+def _item(row):
+    item = dict(row)
+    item.pop("assinatura", None)
+    item["contexto"] = json.loads(item["contexto"] or "{}")
+    item["estrutura"] = json.loads(item["estrutura"]) if item.get("estrutura") else None
+    return item
+
+
+def _chave_filtros(filtros):
+    # Filtros vazios são ignorados: {"area": None} e {} descrevem a mesma exportação.
+    return json.dumps({k: v for k, v in sorted(filtros.items()) if v}, ensure_ascii=False)
+
+
+def _consulta_fts(busca):
+    # Cada palavra vira um prefixo entre aspas: evita erros de sintaxe do FTS5 com o texto livre do usuário.
+    return " ".join(f'"{t}"*' for t in re.findall(r"\w+", busca))
+
+
+class BancoQuestoes:
+    """Questões, análises, contexto e histórico de versões de refinamento, com busca textual e filtros indexados."""
+
+    def __init__(self, caminho):
+        os.makedirs(os.path.dirname(caminho) or ".", exist_ok=True)
+        self._lock = threading.Lock()
+        self._con = sqlite3.connect(caminho, check_same_thread=False)
+        self._con.row_factory = sqlite3.Row
+        self._con.execute("PRAGMA journal_mode=WAL")
+        self._con.execute("PRAGMA foreign_keys=ON")
+        self._con.executescript(ESQUEMA)
+        colunas = {r["name"] for r in self._con.execute("PRAGMA table_info(questoes)")}
+        for coluna, tipo in COLUNAS_NOVAS.items():
+            if coluna not in colunas:
+                self._con.execute(f"ALTER TABLE questoes ADD COLUMN {coluna} {tipo}")
+
+    def inserir(self, item, assinatura=None):
+        """Grava um item no formato da interface e devolve seu id; o título recebe o prefixo "Q<id>: ".
+
+        `assinatura` (bytes) é a assinatura MinHash usada pelo índice de duplicatas; `item["estrutura"]`, quando
+        presente, é o dicionário da questão estruturada (ver questao.Questao).
+        """
+        ctx = item.get("contexto", {})
+        agora = _agora()
+        with self._lock, self._con:
+            cur = self._con.execute(
+                "INSERT INTO questoes (titulo, area, curso, assunto, nivel_bloom, tipo, dificuldade, criado_em, atualizado_em,"
+                " texto_completo, analise_qualidade, contexto, assinatura, estrutura) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (item["titulo"], ctx.get("area"), ctx.get("curso"), ctx.get("assunto"), ctx.get("nivel_bloom"), ctx.get("tipo"),
+                 ctx.get("dificuldade"), agora, agora, item["texto_completo"], item.get("analise_qualidade"),
+                 json.dumps(ctx, ensure_ascii=False), assinatura, _json_ou_none(item.get("estrutura"))),
+            )
+            qid = cur.lastrowid
+            self._con.execute("UPDATE questoes SET titulo = ? WHERE id = ?", (f"Q{qid}: {item['titulo']}", qid))
+            self._con.execute("INSERT INTO versoes (questao_id, criado_em, acao, texto_completo) VALUES (?, ?, ?, ?)",
+                              (qid, agora, "Geração", item["texto_completo"]))
+        return qid
+
+    def atualizar_texto(self, qid, texto_completo, acao, assinatura=None, estrutura=None):
+        """Substitui o texto (e a estrutura, se houver) da questão e guarda a nova versão no histórico."""
+        agora = _agora()
+        with self._lock, self._con:
+            self._con.execute("UPDATE questoes SET texto_completo = ?, atualizado_em = ?, assinatura = ?, estrutura = ? WHERE id = ?",
+                              (texto_completo, agora, assinatura, _json_ou_none(estrutura), qid))
+            self._con.execute("INSERT INTO versoes (questao_id, criado_em, acao, texto_completo) VALUES (?, ?, ?, ?)",
+                              (qid, agora, acao, texto_completo))
+
+    def obter(self, qid):
+        with self._lock:
+            row = self._con.execute("SELECT * FROM questoes WHERE id = ?", (qid,)).fetchone()
+        return _item(row) if row is not None else None
+
+    def gravar_assinatura(self, qid, assinatura):
+        with self._lock, self._con:
+            self._con.execute("UPDATE questoes SET assinatura = ? WHERE id = ?", (assinatura, qid))
+
+    def assinaturas_desde(self, ultimo_id=0):
+        """Gera (id, assinatura ou None, texto_completo, texto_base) das questões com id > ultimo_id, em lotes."""
+        while True:
+            with self._lock:
+                rows = self._con.execute("SELECT id, assinatura, texto_completo, contexto FROM questoes WHERE id > ? ORDER BY id LIMIT 500",
+                                         (ultimo_id,)).fetchall()
+            if not rows:
+                return
+            for r in rows:
+                yield r["id"], r["assinatura"], r["texto_completo"], json.loads(r["contexto"] or "{}").get("texto_base", "")
+            ultimo_id = rows[-1]["id"]
+
+    def versoes(self, qid):
+        with self._lock:
+            rows = self._con.execute("SELECT criado_em, acao, texto_completo FROM versoes WHERE questao_id = ? ORDER BY id DESC", (qid,)).fetchall()
+        return [dict(r) for r in rows]
+
+    def _filtro(self, busca="", area=None, curso=None, nivel_bloom=None):
+        condicoes, params = [], []
+        if busca and _consulta_fts(busca):
+            condicoes.append("id IN (SELECT rowid FROM questoes_fts WHERE questoes_fts MATCH ?)")
+            params.append(_consulta_fts(busca))
+        for coluna, valor in (("area", area), ("curso", curso), ("nivel_bloom", nivel_bloom)):
+            if valor:
+                condicoes.append(f"{coluna} = ?")
+                params.append(valor)
+        return (" WHERE " + " AND ".join(condicoes) if condicoes else ""), params
+
+    def listar(self, busca="", area=None, curso=None, nivel_bloom=None, limite=20, offset=0):
+        """Página de (id, título) da mais recente para a mais antiga."""
+        where, params = self._filtro(busca, area, curso, nivel_bloom)
+        with self._lock:
+            rows = self._con.execute(f"SELECT id, titulo FROM questoes{where} ORDER BY criado_em DESC, id DESC LIMIT ? OFFSET ?",
+                                     params + [limite, offset]).fetchall()
+        return [(r["id"], r["titulo"]) for r in rows]
+
+    def contar(self, busca="", area=None, curso=None, nivel_bloom=None):
+        where, params = self._filtro(busca, area, curso, nivel_bloom)
+        with self._lock:
+            return self._con.execute(f"SELECT COUNT(*) FROM questoes{where}", params).fetchone()[0]
+
+    def iterar(self, busca="", area=None, curso=None, nivel_bloom=None, apos_id=0):
+        """Percorre as questões filtradas (com id > apos_id) em ordem de criação, em lotes, sem carregar o banco inteiro na memória."""
+        where, params = self._filtro(busca, area, curso, nivel_bloom)
+        ultimo = apos_id
+        while True:
+            cond = f"{where} AND id > ?" if where else " WHERE id > ?"
+            with self._lock:
+                rows = self._con.execute(f"SELECT * FROM questoes{cond} ORDER BY id LIMIT 500", params + [ultimo]).fetchall()
+            if not rows:
+                return
+            for r in rows:
+                yield _item(r)
+            ultimo = rows[-1]["id"]
+
+    def registrar_exportacao(self, formato, filtros, ultimo_id, quantidade):
+        """Marca até qual questão (`ultimo_id`) a exportação com esses filtros foi feita, para as exportações incrementais."""
+        with self._lock, self._con:
+            self._con.execute("INSERT INTO exportacoes (criado_em, formato, filtros, ultimo_id, quantidade) VALUES (?, ?, ?, ?, ?)",
+                              (_agora(), formato, _chave_filtros(filtros), ultimo_id, quantidade))
+
+    def ultima_exportacao(self, filtros):
+        """Última exportação feita com os mesmos filtros (dicionário com criado_em, formato, ultimo_id e quantidade) ou None."""
+        with self._lock:
+            row = self._con.execute("SELECT criado_em, formato, ultimo_id, quantidade FROM exportacoes WHERE filtros = ? ORDER BY id DESC LIMIT 1",
+                                    (_chave_filtros(filtros),)).fetchone()
+        return dict(row) if row is not None else None
@@ -0,0 +1,116 @@
+"""Benchmark offline do pipeline contra o servidor fake (sem rede, sem chave real).
+
+Uso:
+    python bench/benchmark.py --tarefas 24 --concorrencia 1,4,16 --latencia 0.3 --jitter 0.1 --saida bench.json
+
+Mede a vazão do lote (texto-base → geração → análise) para cada nível de concorrência, o tempo até o
+primeiro token no streaming e as etapas locais (extração de DOCX, seleção de contexto, MinHash).
+Só o caminho OpenAI é exercitado: o SDK do Gemini não aceita um endpoint local.
+"""
+import argparse
+import io
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from servidor_fake import iniciar_servidor  # noqa: E402
+
+MODELO = "gpt-4o-mini"
+
+
+def _tarefas(n):
+    from gerador import AREAS_ENADE, TIPOS_QUESTAO, BLOOM_LEVELS
+    areas = [(a, c) for a, cursos in AREAS_ENADE.items() for c in cursos]
+    tipos = list(TIPOS_QUESTAO)
+    return [{"area": areas[i % len(areas)][0], "curso": areas[i % len(areas)][1], "assunto": f"assunto de teste {i}",
+             "perfil": "egresso crítico e ético", "competencia": "analisar situações-problema", "tipo": tipos[i % len(tipos)],
+             "dificuldade": 3, "nivel_bloom": BLOOM_LEVELS[i % len(BLOOM_LEVELS)]} for i in range(n)]
+
+
+def medir_lote(n_tarefas, concorrencia):
+    import lote
+    from gerador import PROVEDORES
+    from metricas import METRICAS
+    METRICAS.limpar()
+    with tempfile.TemporaryDirectory() as tmp:
+        inicio = time.perf_counter()
+        ok, falhas = lote.executar_lote(_tarefas(n_tarefas), os.path.join(tmp, "saida.jsonl"), PROVEDORES["openai"], MODELO,
+                                        "chave-fake", concorrencia=concorrencia)
+        tempo = time.perf_counter() - inicio
+    return {"concorrencia": concorrencia, "tarefas": n_tarefas, "ok": ok, "falhas": falhas, "tempo_s": round(tempo, 3),
+            "questoes_por_min": round(60 * ok / tempo, 1), "etapas": METRICAS.resumo()}
+
+
+def medir_streaming(repeticoes=5):
+    from gerador import PROVEDORES, gerar_resposta_stream
+    from metricas import METRICAS
+    METRICAS.limpar()
+    for i in range(repeticoes):
+        for _ in gerar_resposta_stream([{"role": "user", "content": f"texto {i}"}], PROVEDORES["openai"], MODELO, "chave-fake",
+                                       max_tokens=400, etapa="streaming"):
+            pass
+    return METRICAS.resumo()
+
+
+def medir_etapas_locais():
+    from docx import Document
+    from contexto import selecionar_contexto
+    from documentos import TIPO_DOCX, extrair_texto
+    from duplicatas import assinatura
+    resultados = {}
+    doc = Document()
+    for i in range(3000):
+        doc.add_paragraph(f"Parágrafo {i}: a avaliação do processo considera critérios técnicos, normas e evidências do projeto.")
+    buf = io.BytesIO()
+    doc.save(buf)
+    t = time.perf_counter()
+    texto = extrair_texto(buf.getvalue(), TIPO_DOCX)
+    resultados["extracao_docx_s"] = round(time.perf_counter() - t, 4)
+    t = time.perf_counter()
+    selecionar_contexto(texto, "avaliação de normas técnicas em projetos", 1000)
+    resultados["selecao_contexto_s"] = round(time.perf_counter() - t, 4)
+    t = time.perf_counter()
+    for i in range(200):
+        assinatura(texto[i * 500:(i + 1) * 500])
+    resultados["minhash_por_questao_ms"] = round((time.perf_counter() - t) / 200 * 1000, 3)
+    resultados["caracteres_documento"] = len(texto)
+    return resultados
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Benchmark offline do gerador contra um servidor OpenAI-compatível local.")
+    ap.add_argument("--tarefas", type=int, default=24)
+    ap.add_argument("--concorrencia", default="1,4,16", help="níveis de concorrência separados por vírgula")
+    ap.add_argument("--latencia", type=float, default=0.3)
+    ap.add_argument("--jitter", type=float, default=0.1)
+    ap.add_argument("--tokens-por-segundo", type=float, default=1000.0)
+    ap.add_argument("--saida", default=None, help="grava o resultado completo em JSON")
+    args = ap.parse_args()
+
+    srv, base_url = iniciar_servidor(latencia=args.latencia, jitter=args.jitter, tokens_por_segundo=args.tokens_por_segundo)
+    os.environ["OPENAI_BASE_URL"] = base_url
+    os.environ.setdefault("ENADE_DADOS_DIR", tempfile.mkdtemp(prefix="bench_enade_"))
+    try:
+        resultado = {"parametros": vars(args),
+                     "lote": [medir_lote(args.tarefas, int(c)) for c in args.concorrencia.split(",")],
+                     "streaming": medir_streaming(),
+                     "etapas_locais": medir_etapas_locais()}
+    finally:
+        srv.shutdown()
+
+    for r in resultado["lote"]:
+        print(f"concorrência {r['concorrencia']:>3}: {r['ok']}/{r['tarefas']} em {r['tempo_s']:.2f}s → {r['questoes_por_min']} questões/min")
+    for e in resultado["streaming"]:
+        print(f"streaming: ttft médio {e['ttft_medio_s']}s, total médio {e['tempo_medio_s']}s")
+    print("etapas locais:", json.dumps(resultado["etapas_locais"], ensure_ascii=False))
+    if args.saida:
+        with open(args.saida, "w", encoding="utf-8") as f:
+            json.dump(resultado, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""Mede o custo de importação na partida do app (python -X importtime), por módulo.
+
+Uso:
+    python bench/importacoes.py                # o que a partida do app importa, agrupado por pacote
+    python bench/importacoes.py --recursos     # custo adiado de cada recurso (provedor, upload, busca web, exportação)
+
+Cada medição roda em um processo novo (sem módulos em memória, como um worker recém-criado); com
+--repeticoes, vale a execução mais rápida.
+"""
+import argparse
+import os
+import re
+import subprocess
+import sys
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Importações de topo de questosEnade.py: o que todo worker paga antes de desenhar a primeira tela.
+PARTIDA = ["streamlit", "cache_disco", "gerador", "documentos", "contexto", "banco", "questao", "metricas", "duplicatas", "busca_web", "exportacao"]
+
+# Dependências carregadas só quando o recurso é usado.
+RECURSOS = {
+    "OpenAI": ["openai"],
+    "Gemini": ["google.generativeai"],
+    "upload PDF": ["PyPDF2"],
+    "upload DOCX": ["docx"],
+    "busca web": ["requests", "bs4", "lxml"],
+    "contexto e duplicatas": ["numpy"],
+    "exportação XLSX": ["openpyxl"],
+    "exportação Parquet": ["pyarrow"],
+}
+PESADOS = sorted({m for mods in RECURSOS.values() for m in mods})
+
+_LINHA = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+
+def medir(modulos, repeticoes=1):
+    """Importa `modulos` em um processo novo; devolve [(nome, proprio_us, acumulado_us, nivel)] da execução mais rápida."""
+    melhor = None
+    for _ in range(repeticoes):
+        r = subprocess.run([sys.executable, "-X", "importtime", "-c", "import " + ", ".join(modulos)],
+                           cwd=RAIZ, capture_output=True, text=True)
+        if r.returncode != 0:
+            raise RuntimeError(r.stderr.strip().splitlines()[-1])
+        linhas = [(m[4], int(m[1]), int(m[2]), len(m[3]) // 2) for m in map(_LINHA.match, r.stderr.splitlines()) if m]
+        if melhor is None or sum(l[1] for l in linhas) < sum(l[1] for l in melhor):
+            melhor = linhas
+    return melhor
+
+
+def por_pacote(linhas):
+    totais = {}
+    for nome, proprio, _, _ in linhas:
+        pacote = nome.split(".")[0]
+        totais[pacote] = totais.get(pacote, 0) + proprio
+    return sorted(totais.items(), key=lambda t: -t[1])
+
+
+def relatorio_partida(repeticoes, top):
+    linhas = medir(PARTIDA, repeticoes)
+    total = sum(l[1] for l in linhas)
+    print(f"Partida do app: {total / 1000:.0f} ms em {len(linhas)} módulos\n")
+    print("Módulos do app (tempo acumulado, inclui dependências ainda não carregadas):")
+    carregados = {l[0] for l in linhas}
+    for nome, _, acumulado, _ in linhas:
+        if nome in PARTIDA:
+            print(f"  {nome:<20} {acumulado / 1000:8.1f} ms")
+    print(f"\nPacotes mais caros (tempo próprio somado, top {top}):")
+    for pacote, proprio in por_pacote(linhas)[:top]:
+        print(f"  {pacote:<20} {proprio / 1000:8.1f} ms")
+    indevidos = [m for m in PESADOS if m in carregados]
+    print("\nDependências de recursos carregadas na partida:", ", ".join(indevidos) if indevidos else "nenhuma")
+
+
+def relatorio_recursos(repeticoes):
+    # Custo marginal: tempo próprio dos módulos que o recurso acrescenta aos já carregados na partida.
+    base = {l[0] for l in medir(PARTIDA, 1)}
+    print("Custo adiado por recurso (pago no primeiro uso):")
+    for recurso, modulos in RECURSOS.items():
+        try:
+            linhas = medir(PARTIDA + modulos, repeticoes)
+        except RuntimeError as e:
+            print(f"  {recurso:<22} indisponível ({e})")
+            continue
+        novos = [l for l in linhas if l[0] not in base]
+        print(f"  {recurso:<22} {sum(l[1] for l in novos) / 1000:8.1f} ms  {len(novos):5d} módulos  ({', '.join(modulos)})")
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Custo de importação na partida do gerador de questões.")
+    ap.add_argument("--recursos", action="store_true", help="mede o custo adiado de cada recurso")
+    ap.add_argument("--repeticoes", type=int, default=3)
+    ap.add_argument("--top", type=int, default=15)
+    args = ap.parse_args()
+    if args.recursos:
+        relatorio_recursos(args.repeticoes)
+    else:
+        relatorio_partida(args.repeticoes, args.top)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""Servidor local compatível com o endpoint de chat da OpenAI, para benchmarks sem rede.
+
+Uso:
+    python bench/servidor_fake.py --porta 8765 --latencia 0.5 --jitter 0.2 --tokens-por-segundo 200
+
+Depois aponte o SDK para ele com OPENAI_BASE_URL=http://127.0.0.1:8765/v1 (qualquer chave de API serve).
+"""
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+PALAVRAS = ("análise", "competência", "profissional", "situação", "contexto", "critério", "avaliação", "processo",
+            "resultado", "decisão", "norma", "projeto", "evidência", "método", "impacto", "egresso")
+
+
+def _texto(n_palavras, rng):
+    return " ".join(rng.choice(PALAVRAS) for _ in range(n_palavras)) + "."
+
+
+def _questao_json(rng):
+    return json.dumps({
+        "enunciado": "Considerando a situação descrita, " + _texto(30, rng),
+        "alternativas": {l: _texto(15, rng) for l in "ABCDE"},
+        "gabarito": rng.choice("ABCDE"),
+        "justificativas": {l: _texto(20, rng) for l in "ABCDE"},
+    }, ensure_ascii=False)
+
+
+class ServidorFake(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, endereco, latencia=0.3, jitter=0.1, tokens_por_segundo=300.0):
+        super().__init__(endereco, _Handler)
+        self.latencia = latencia
+        self.jitter = jitter
+        self.tokens_por_segundo = tokens_por_segundo
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def do_POST(self):
+        if not self.path.endswith("/chat/completions"):
+            self.send_error(404)
+            return
+        corpo = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        rng = random.Random()
+        srv = self.server
+        # Latência até o primeiro token, com variação uniforme.
+        time.sleep(max(0.0, srv.latencia + rng.uniform(-srv.jitter, srv.jitter)))
+        if (corpo.get("response_format") or {}).get("type") == "json_object":
+            conteudo = _questao_json(rng)
+        else:
+            conteudo = _texto(min(int(corpo.get("max_tokens") or 400), 400) // 2, rng)
+        tokens_prompt = sum(len(str(m.get("content", ""))) for m in corpo.get("messages", [])) // 4
+        partes = conteudo.split(" ")
+        uso = {"prompt_tokens": tokens_prompt, "completion_tokens": len(partes), "total_tokens": tokens_prompt + len(partes)}
+        base = {"id": "chatcmpl-fake", "created": int(time.time()), "model": corpo.get("model", "fake")}
+        if corpo.get("stream"):
+            self._stream(base, partes, uso)
+        else:
+            time.sleep(len(partes) / srv.tokens_por_segundo)
+            self._json({**base, "object": "chat.completion", "usage": uso,
+                        "choices": [{"index": 0, "message": {"role": "assistant", "content": conteudo}, "finish_reason": "stop"}]})
+
+    def _json(self, dados):
+        b = json.dumps(dados, ensure_ascii=False).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(b)))
+        self.end_headers()
+        self.wfile.write(b)
+
+    def _stream(self, base, partes, uso):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        intervalo = 1.0 / self.server.tokens_por_segundo
+        for i, parte in enumerate(partes):
+            delta = {"content": parte if i == 0 else " " + parte}
+            self._evento({**base, "object": "chat.completion.chunk", "choices": [{"index": 0, "delta": delta, "finish_reason": None}]})
+            time.sleep(intervalo)
+        self._evento({**base, "object": "chat.completion.chunk", "choices": [], "usage": uso})
+        self.wfile.write(b"data: [DONE]\n\n")
+        self.wfile.flush()
+        self.close_connection = True
+
+    def _evento(self, dados):
+        self.wfile.write(f"data: {json.dumps(dados, ensure_ascii=False)}\n\n".encode("utf-8"))
+        self.wfile.flush()
+
+
+def iniciar_servidor(porta=0, latencia=0.3, jitter=0.1, tokens_por_segundo=300.0):
+    """Sobe o servidor em uma thread e devolve (servidor, base_url)."""
+    srv = ServidorFake(("127.0.0.1", porta), latencia, jitter, tokens_por_segundo)
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    return srv, f"http://127.0.0.1:{srv.server_address[1]}/v1"
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Servidor OpenAI-compatível de teste, com latência configurável.")
+    ap.add_argument("--porta", type=int, default=8765)
+    ap.add_argument("--latencia", type=float, default=0.3, help="segundos até o primeiro token")
+    ap.add_argument("--jitter", type=float, default=0.1, help="variação máxima (±) da latência, em segundos")
+    ap.add_argument("--tokens-por-segundo", type=float, default=300.0)
+    args = ap.parse_args()
+    srv = ServidorFake(("127.0.0.1", args.porta), args.latencia, args.jitter, args.tokens_por_segundo)
+    print(f"Servidor fake em http://127.0.0.1:{args.porta}/v1")
+    srv.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
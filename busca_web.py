@@ -0,0 +1,111 @@
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from metricas import METRICAS
+
+# Busca de notícias e extração de artigos com sessão HTTP compartilhada, pré-carregamento e revalidação condicional.
+
+HEADERS = {"User-Agent": "Mozilla/5.0", "Accept-Language": "pt-BR,pt;q=0.9"}
+MAX_PREFETCH = 4
+# Páginas sem ETag/Last-Modified não podem ser revalidadas: a cópia em disco vale por este período.
+VALIDADE_SEM_VALIDADOR = 3600
+
+_lock_sessao = threading.Lock()
+_sessao = None
+_pool_prefetch = ThreadPoolExecutor(max_workers=MAX_PREFETCH, thread_name_prefix="prefetch")
+
+
+def sessao_http():
+    """Sessão única (pool de conexões keep-alive) com novas tentativas para falhas transitórias."""
+    # requests/bs4 só são carregados na primeira busca: a partida do app não paga por eles.
+    import requests
+    from requests.adapters import HTTPAdapter
+    from urllib3.util.retry import Retry
+    global _sessao
+    with _lock_sessao:
+        if _sessao is None:
+            retry = Retry(total=3, backoff_factor=0.5, status_forcelist=[429, 500, 502, 503, 504], allowed_methods=["GET", "HEAD"])
+            adaptador = HTTPAdapter(pool_connections=8, pool_maxsize=MAX_PREFETCH * 2, max_retries=retry)
+            _sessao = requests.Session()
+            _sessao.headers.update(HEADERS)
+            _sessao.mount("https://", adaptador)
+            _sessao.mount("http://", adaptador)
+        return _sessao
+
+
+def _analisar_artigo(html):
+    from bs4 import BeautifulSoup
+    soup = BeautifulSoup(html, "lxml")
+    title = soup.title.string if soup.title and soup.title.string else ""
+    author_meta = soup.find("meta", attrs={"name": "author"})
+    author = author_meta.get("content", "") if author_meta else ""
+    for tag in soup(["script", "style", "nav", "footer", "header", "aside"]): tag.decompose()
+    return " ".join(soup.stripped_strings), title, author
+
+
+def extrair_conteudo_url(url, cache=None):
+    """Devolve (conteúdo, título, autor) do artigo, revalidando a cópia em disco com ETag/Last-Modified."""
+    with METRICAS.medir("busca web (artigo)") as reg:
+        conteudo, titulo, autor, reg["cache_hit"] = _extrair_conteudo_url(url, cache)
+        if conteudo is None:
+            reg["erro"] = "falha ao obter o artigo"
+    return conteudo, titulo, autor
+
+
+def _extrair_conteudo_url(url, cache):
+    chave = f"url:{url}"
+    em_cache = cache.obter(chave) if cache is not None else None
+    registro = json.loads(em_cache) if em_cache else None
+    headers = {}
+    if registro and not (registro.get("etag") or registro.get("last_modified")) and time.time() - registro["obtido_em"] < VALIDADE_SEM_VALIDADOR:
+        return registro["conteudo"], registro["titulo"], registro["autor"], True
+    if registro:
+        if registro.get("etag"):
+            headers["If-None-Match"] = registro["etag"]
+        if registro.get("last_modified"):
+            headers["If-Modified-Since"] = registro["last_modified"]
+    try:
+        r = sessao_http().get(url, headers=headers, timeout=10)
+        if r.status_code == 304 and registro:
+            return registro["conteudo"], registro["titulo"], registro["autor"], True
+        r.raise_for_status()
+        conteudo, titulo, autor = _analisar_artigo(r.content)
+    except Exception:
+        # Sem rede ou erro no site: a última cópia conhecida é melhor que nada.
+        if registro:
+            return registro["conteudo"], registro["titulo"], registro["autor"], True
+        return None, None, None, False
+    if cache is not None:
+        cache.gravar(chave, json.dumps({"etag": r.headers.get("ETag"), "last_modified": r.headers.get("Last-Modified"), "obtido_em": time.time(),
+                                        "conteudo": conteudo, "titulo": titulo, "autor": autor}, ensure_ascii=False))
+    return conteudo, titulo, autor, False
+
+
+def prefetch_artigos(urls, cache=None):
+    """Dispara a extração de todos os artigos em segundo plano; devolve {url: Future}."""
+    return {url: _pool_prefetch.submit(extrair_conteudo_url, url, cache) for url in dict.fromkeys(urls)}
+
+
+def search_articles(query, num=5, search_type='web'):
+    with METRICAS.medir("busca web (pesquisa)"):
+        return _search_articles(query, num, search_type)
+
+
+def _search_articles(query, num, search_type):
+    params = {"q": query, "hl": "pt-BR", "gl": "br", "num": num}
+    if search_type == 'news':
+        params['tbm'] = 'nws'
+    r = sessao_http().get("https://www.google.com/search", params=params, timeout=10)
+    r.raise_for_status()
+    from bs4 import BeautifulSoup
+    soup = BeautifulSoup(r.content, "lxml")
+    results = []
+    # --- SELETORES ATUALIZADOS PARA BUSCA DE NOTÍCIAS (NOV/2023) ---
+    # Google pode alterar esses seletores a qualquer momento.
+    for block in soup.select("a.WlydOe, a.JtKRv, a.DY5T1d"):
+        title_element = block.find("div", role="heading")
+        if title_element:
+            results.append({"title": title_element.get_text(), "url": block['href']})
+        if len(results) >= num: break
+    return results
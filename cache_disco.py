@@ -0,0 +1,90 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+# --- CACHE PERSISTENTE EM DISCO (SQLite) ---
+# Chave = hash do conteúdo da requisição; sobrevive a reinícios do processo.
+
+
+def chave_llm(prov, mdl, prompts, temperature, max_tokens):
+    """Gera a chave (sha256) de uma chamada ao LLM a partir de todos os parâmetros que influenciam a resposta."""
+    bruto = json.dumps(
+        {"prov": prov, "mdl": mdl, "prompts": prompts, "temperature": temperature, "max_tokens": max_tokens},
+        ensure_ascii=False, sort_keys=True,
+    )
+    return hashlib.sha256(bruto.encode("utf-8")).hexdigest()
+
+
+class CacheDisco:
+    """Armazena pares chave/valor (texto) em SQLite com expiração por TTL e despejo LRU por número de itens e tamanho."""
+
+    def __init__(self, caminho, max_itens=5000, max_bytes=200 * 1024 * 1024, ttl=7 * 24 * 3600):
+        os.makedirs(os.path.dirname(caminho) or ".", exist_ok=True)
+        self.max_itens = max_itens
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._con = sqlite3.connect(caminho, check_same_thread=False)
+        self._con.execute("PRAGMA journal_mode=WAL")
+        self._con.execute(
+            "CREATE TABLE IF NOT EXISTS cache ("
+            " chave TEXT PRIMARY KEY, valor TEXT NOT NULL, tamanho INTEGER NOT NULL,"
+            " criado_em REAL NOT NULL, acessado_em REAL NOT NULL)"
+        )
+        self._con.execute("CREATE INDEX IF NOT EXISTS ix_cache_acessado ON cache (acessado_em)")
+        self._con.commit()
+
+    def obter(self, chave):
+        agora = time.time()
+        with self._lock:
+            row = self._con.execute("SELECT valor, criado_em FROM cache WHERE chave = ?", (chave,)).fetchone()
+            if row is None or (self.ttl and agora - row[1] > self.ttl):
+                if row is not None:
+                    self._con.execute("DELETE FROM cache WHERE chave = ?", (chave,))
+                    self._con.commit()
+                self.misses += 1
+                return None
+            self._con.execute("UPDATE cache SET acessado_em = ? WHERE chave = ?", (agora, chave))
+            self._con.commit()
+            self.hits += 1
+            return row[0]
+
+    def gravar(self, chave, valor):
+        agora = time.time()
+        tamanho = len(valor.encode("utf-8"))
+        with self._lock:
+            self._con.execute(
+                "INSERT OR REPLACE INTO cache (chave, valor, tamanho, criado_em, acessado_em) VALUES (?, ?, ?, ?, ?)",
+                (chave, valor, tamanho, agora, agora),
+            )
+            self._despejar()
+            self._con.commit()
+
+    def _despejar(self):
+        # Remove expirados e, em seguida, os menos usados recentemente até respeitar os limites.
+        if self.ttl:
+            self._con.execute("DELETE FROM cache WHERE criado_em < ?", (time.time() - self.ttl,))
+        n, total = self._con.execute("SELECT COUNT(*), COALESCE(SUM(tamanho), 0) FROM cache").fetchone()
+        if n <= self.max_itens and total <= self.max_bytes:
+            return
+        for chave, tamanho in self._con.execute("SELECT chave, tamanho FROM cache ORDER BY acessado_em").fetchall():
+            if n <= self.max_itens and total <= self.max_bytes:
+                break
+            self._con.execute("DELETE FROM cache WHERE chave = ?", (chave,))
+            n -= 1
+            total -= tamanho
+
+    def estatisticas(self):
+        with self._lock:
+            n, total = self._con.execute("SELECT COUNT(*), COALESCE(SUM(tamanho), 0) FROM cache").fetchone()
+        return {"hits": self.hits, "misses": self.misses, "itens": n, "bytes": total}
+
+    def limpar(self):
+        with self._lock:
+            self._con.execute("DELETE FROM cache")
+            self._con.commit()
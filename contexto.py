@@ -0,0 +1,86 @@
+import re
+import unicodedata
+from documentos import dividir_em_blocos
+
+# Seleção de contexto: em vez de cortar a fonte nos primeiros N caracteres, ranqueia passagens
+# contra o assunto/perfil/competência (BM25) e monta o contexto até o orçamento de tokens do modelo.
+
+ORCAMENTO_CONTEXTO = {
+    "gpt-4o-mini": 1200,
+    "gpt-4o": 1000,
+    "gpt-3.5-turbo": 1000,
+    "gemini-1.5-flash-latest": 1500,
+    "gemini-1.5-pro-latest": 1000,
+}
+ORCAMENTO_PADRAO = 1000
+STOPWORDS = set("""
+a ao aos as com como da das de del do dos e em entre era essa esse esta este foi ha isso mais mas na nas nao no nos
+o os ou para pela pelas pelo pelos por que se sem ser seu sua suas seus sobre sao tem um uma umas uns the of and to in
+""".split())
+
+
+def estimar_tokens(texto):
+    # Aproximação de ~4 caracteres por token, suficiente para orçamentos.
+    return len(texto) // 4
+
+
+def orcamento_contexto(mdl):
+    return ORCAMENTO_CONTEXTO.get(mdl, ORCAMENTO_PADRAO)
+
+
+def _tokenizar(texto):
+    texto = unicodedata.normalize("NFKD", texto.lower()).encode("ascii", "ignore").decode("ascii")
+    # Truncar em 6 caracteres funciona como um stemming grosseiro (ponte/pontes, avaliar/avaliação).
+    return [t[:6] for t in re.findall(r"[a-z0-9]+", texto) if len(t) > 2 and t not in STOPWORDS]
+
+
+def dividir_passagens(texto, max_chars=500):
+    """Divide o texto em passagens de até `max_chars` caracteres (frases longas demais são cortadas)."""
+    return [p.strip() for p in dividir_em_blocos(texto, max_chars) if p.strip()]
+
+
+def pontuar_bm25(passagens, consulta, k1=1.5, b=0.75):
+    """Pontuação BM25 de cada passagem; só as colunas dos termos da consulta são materializadas."""
+    import numpy as np
+    termos = _tokenizar(consulta)
+    if not passagens or not termos:
+        return np.zeros(len(passagens))
+    vocab = {t: j for j, t in enumerate(dict.fromkeys(termos))}
+    peso_consulta = np.bincount([vocab[t] for t in termos], minlength=len(vocab)).astype(float)
+    tokens = [_tokenizar(p) for p in passagens]
+    linhas, colunas = [], []
+    for i, toks in enumerate(tokens):
+        for t in toks:
+            j = vocab.get(t)
+            if j is not None:
+                linhas.append(i)
+                colunas.append(j)
+    tf = np.zeros((len(passagens), len(vocab)))
+    np.add.at(tf, (linhas, colunas), 1)
+    dl = np.array([len(t) for t in tokens], dtype=float)
+    norm = k1 * (1 - b + b * dl / max(dl.mean(), 1.0))
+    df = (tf > 0).sum(axis=0)
+    idf = np.log(1 + (len(passagens) - df + 0.5) / (df + 0.5))
+    return (tf * (k1 + 1) / (tf + norm[:, None])) @ (idf * peso_consulta)
+
+
+def selecionar_contexto(texto, consulta, max_tokens=ORCAMENTO_PADRAO):
+    """Devolve as passagens mais relevantes para `consulta` que cabem em `max_tokens`, na ordem original do texto."""
+    if estimar_tokens(texto) <= max_tokens:
+        return texto
+    import numpy as np
+    passagens = dividir_passagens(texto)
+    scores = pontuar_bm25(passagens, consulta)
+    # Ordenação estável: empates (inclusive tudo zero) mantêm a ordem do documento.
+    ordem = np.argsort(-scores, kind="stable")
+    escolhidas, usados = [], 0
+    for i in ordem:
+        custo = estimar_tokens(passagens[i]) + 1
+        if usados + custo > max_tokens:
+            continue
+        escolhidas.append(i)
+        usados += custo
+    if not escolhidas:
+        # Orçamento menor que qualquer passagem: vai o início da mais relevante, nunca um contexto vazio.
+        return passagens[ordem[0]][:max_tokens * 4] if passagens else texto[:max_tokens * 4]
+    return "\n".join(passagens[i] for i in sorted(escolhidas))
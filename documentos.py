@@ -0,0 +1,53 @@
+import re
+from io import BytesIO
+
+# Extração incremental de texto de arquivos enviados (PDF/DOCX).
+# PyPDF2 e python-docx só são importados quando chega um arquivo do tipo correspondente.
+
+TIPO_PDF = "application/pdf"
+TIPO_DOCX = "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+
+
+def iterar_trechos(dados, tipo):
+    """Gera o texto página a página (PDF) ou parágrafo a parágrafo (DOCX), sem montar o documento inteiro."""
+    if tipo == TIPO_PDF:
+        import PyPDF2
+        for pagina in PyPDF2.PdfReader(BytesIO(dados)).pages:
+            yield pagina.extract_text() or ""
+    elif tipo == TIPO_DOCX:
+        from docx import Document
+        for p in Document(BytesIO(dados)).paragraphs:
+            yield p.text + "\n"
+    else:
+        raise ValueError(f"Tipo de arquivo não suportado: {tipo}")
+
+
+def extrair_texto(dados, tipo, limite=None):
+    """Concatena os trechos do documento, parando assim que `limite` caracteres forem atingidos (None = documento todo)."""
+    partes, total = [], 0
+    for trecho in iterar_trechos(dados, tipo):
+        partes.append(trecho)
+        total += len(trecho)
+        if limite is not None and total >= limite:
+            break
+    texto = "".join(partes)
+    return texto[:limite] if limite is not None else texto
+
+
+def dividir_em_blocos(texto, tamanho=4000):
+    """Divide o texto em blocos de até `tamanho` caracteres, preferindo quebrar em fim de frase ou parágrafo."""
+    blocos, atual = [], ""
+    for frase in re.split(r"(?<=[.!?])\s+|\n{2,}", texto):
+        if not frase:
+            continue
+        if atual and len(atual) + len(frase) + 1 > tamanho:
+            blocos.append(atual)
+            atual = ""
+        # Frases maiores que o bloco inteiro são cortadas à força.
+        while len(frase) > tamanho:
+            blocos.append(frase[:tamanho])
+            frase = frase[tamanho:]
+        atual = f"{atual} {frase}" if atual else frase
+    if atual.strip():
+        blocos.append(atual)
+    return blocos
@@ -0,0 +1,98 @@
+import re
+import threading
+import unicodedata
+import zlib
+from functools import lru_cache
+
+# Detecção de quase-duplicatas com MinHash + LSH: cada consulta só compara a questão nova
+# com as candidatas que colidem em alguma banda, em vez de percorrer o banco inteiro.
+
+N_PERMUTACOES = 128
+BANDAS = 16  # 16 bandas x 8 linhas: candidatas a partir de ~70% de similaridade
+LINHAS = N_PERMUTACOES // BANDAS
+TAMANHO_SHINGLE = 5
+LIMIAR_DUPLICATA = 0.8
+_PRIMO = 4294967291  # maior primo < 2^32: a*x + b cabe em uint64
+
+
+@lru_cache(maxsize=1)
+def _permutacoes():
+    # numpy só é carregado na primeira assinatura, não na partida do app.
+    import numpy as np
+    rng = np.random.default_rng(20250710)
+    return (rng.integers(1, _PRIMO, N_PERMUTACOES, dtype=np.uint64), rng.integers(0, _PRIMO, N_PERMUTACOES, dtype=np.uint64))
+
+
+def texto_para_indice(texto_completo, texto_base=""):
+    # O texto-base é compartilhado por várias questões do mesmo assunto e não deve contar como repetição.
+    return texto_completo.replace(texto_base, "") if texto_base else texto_completo
+
+
+def assinatura(texto):
+    """Assinatura MinHash (uint32[N_PERMUTACOES]) dos shingles de palavras do texto."""
+    texto = unicodedata.normalize("NFKD", texto.lower()).encode("ascii", "ignore").decode("ascii")
+    palavras = re.findall(r"[a-z0-9]+", texto)
+    n = max(1, len(palavras) - TAMANHO_SHINGLE + 1)
+    shingles = {" ".join(palavras[i:i + TAMANHO_SHINGLE]) for i in range(n)}
+    import numpy as np
+    a, b = _permutacoes()
+    primo = np.uint64(_PRIMO)
+    h = np.fromiter((zlib.crc32(s.encode()) for s in shingles), dtype=np.uint64, count=len(shingles)) % primo
+    return ((a[:, None] * h[None, :] + b[:, None]) % primo).min(axis=1).astype(np.uint32)
+
+
+class IndiceDuplicatas:
+    """Índice LSH em memória, atualizado incrementalmente a cada questão gravada ou refinada."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._assinaturas = {}
+        self._buckets = [dict() for _ in range(BANDAS)]
+        self.ultimo_id = 0
+
+    def _chaves(self, sig):
+        return [sig[b * LINHAS:(b + 1) * LINHAS].tobytes() for b in range(BANDAS)]
+
+    def adicionar(self, qid, sig):
+        with self._lock:
+            self._remover(qid)
+            self._assinaturas[qid] = sig
+            for b, chave in enumerate(self._chaves(sig)):
+                self._buckets[b].setdefault(chave, set()).add(qid)
+
+    def _remover(self, qid):
+        sig = self._assinaturas.pop(qid, None)
+        if sig is None:
+            return
+        for b, chave in enumerate(self._chaves(sig)):
+            self._buckets[b].get(chave, set()).discard(qid)
+
+    def consultar(self, sig, limiar=LIMIAR_DUPLICATA, ignorar=None):
+        """Lista (id, similaridade estimada) das questões com similaridade >= limiar, da mais parecida para a menos."""
+        import numpy as np
+        with self._lock:
+            candidatos = set()
+            for b, chave in enumerate(self._chaves(sig)):
+                candidatos |= self._buckets[b].get(chave, set())
+            candidatos.discard(ignorar)
+            similares = [(qid, float(np.mean(self._assinaturas[qid] == sig))) for qid in candidatos]
+        return sorted([s for s in similares if s[1] >= limiar], key=lambda s: -s[1])
+
+    def sincronizar(self, banco):
+        """Carrega as questões gravadas no banco depois da última conhecida (inclusive por outros processos)."""
+        import numpy as np
+        for qid, blob, texto_completo, texto_base in banco.assinaturas_desde(self.ultimo_id):
+            if blob is None:
+                # Questões gravadas sem assinatura (ex.: antes deste índice existir) são calculadas uma única vez.
+                sig = assinatura(texto_para_indice(texto_completo, texto_base))
+                banco.gravar_assinatura(qid, sig.tobytes())
+            else:
+                sig = np.frombuffer(blob, dtype=np.uint32)
+            self.adicionar(qid, sig)
+            # Só a sincronização avança o cursor: `adicionar` de uma questão nova não pode pular linhas de
+            # ids menores gravadas nesse meio-tempo por outro processo (ex.: lote.py --salvar-no-banco).
+            with self._lock:
+                self.ultimo_id = max(self.ultimo_id, qid)
+
+    def __len__(self):
+        return len(self._assinaturas)
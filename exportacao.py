@@ -0,0 +1,169 @@
+"""Exportação do banco de questões em XLSX, CSV, JSONL ou Parquet, gravada linha a linha.
+
+Uso:
+    python exportacao.py -o questoes.xlsx --area "Engenharias" --desde-ultima
+
+O formato vem da extensão do arquivo de saída (ou de --formato). Com --desde-ultima, só entram as questões
+gravadas depois da última exportação feita com os mesmos filtros.
+"""
+import argparse
+import csv
+import importlib.util
+import io
+import json
+import os
+import sys
+from contextlib import nullcontext
+
+from banco import BancoQuestoes
+from gerador import CAMINHO_BANCO
+from questao import LETRAS
+
+COLUNAS = (["id", "titulo", "area", "curso", "assunto", "tipo", "nivel_bloom", "dificuldade", "perfil", "competencia",
+            "criado_em", "atualizado_em", "texto_base", "referencia", "enunciado"]
+           + [f"alternativa_{l.lower()}" for l in LETRAS] + ["gabarito"]
+           + [f"justificativa_{l.lower()}" for l in LETRAS] + ["analise_qualidade", "texto_completo"])
+COLUNAS_INTEIRAS = {"id", "dificuldade"}
+
+# formato: (rótulo, tipo MIME)
+FORMATOS = {
+    "xlsx": ("Excel (.xlsx)", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"),
+    "csv": ("CSV", "text/csv"),
+    "jsonl": ("JSON Lines", "application/jsonl"),
+    "parquet": ("Parquet", "application/vnd.apache.parquet"),
+}
+LINHAS_POR_GRUPO_PARQUET = 500
+
+
+def formatos_disponiveis():
+    # Parquet depende do pyarrow, que é opcional.
+    return [f for f in FORMATOS if f != "parquet" or importlib.util.find_spec("pyarrow")]
+
+
+def linha_exportacao(item):
+    """Achata uma questão do banco em um dicionário com as colunas de COLUNAS.
+
+    Questões estruturadas saem campo a campo e sem o texto completo; as antigas, gravadas só como texto,
+    trazem o texto completo e deixam os campos estruturados vazios.
+    """
+    ctx = item.get("contexto") or {}
+    est = item.get("estrutura")
+    linha = dict.fromkeys(COLUNAS)
+    linha.update({c: item.get(c) for c in ("id", "titulo", "area", "curso", "assunto", "tipo", "nivel_bloom", "dificuldade",
+                                            "criado_em", "atualizado_em", "analise_qualidade")})
+    linha.update(perfil=ctx.get("perfil"), competencia=ctx.get("competencia"), texto_base=ctx.get("texto_base"))
+    if not est:
+        linha["texto_completo"] = item.get("texto_completo")
+        return linha
+    linha.update(texto_base=est["texto_base"], referencia=est["referencia"], enunciado=est["enunciado"], gabarito=est["gabarito"])
+    for l in LETRAS:
+        linha[f"alternativa_{l.lower()}"] = est["alternativas"].get(l)
+        linha[f"justificativa_{l.lower()}"] = est["justificativas"].get(l)
+    return linha
+
+
+def _gravar_xlsx(linhas, arq):
+    from openpyxl import Workbook
+    from openpyxl.cell.cell import ILLEGAL_CHARACTERS_RE
+    # Modo write-only: as linhas vão direto para o arquivo, sem manter a planilha inteira em memória.
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("Questões")
+    ws.append(COLUNAS)
+    for linha in linhas:
+        # Caracteres de controle vindos da IA ou de PDFs são rejeitados pelo formato.
+        ws.append([ILLEGAL_CHARACTERS_RE.sub("", v) if isinstance(v, str) else v for v in linha.values()])
+    wb.save(arq)
+
+
+def _gravar_csv(linhas, arq):
+    # BOM para o Excel reconhecer UTF-8 ao abrir o arquivo diretamente.
+    texto = io.TextIOWrapper(arq, encoding="utf-8-sig", newline="")
+    w = csv.DictWriter(texto, fieldnames=COLUNAS)
+    w.writeheader()
+    w.writerows(linhas)
+    texto.flush()
+    texto.detach()
+
+
+def _gravar_jsonl(linhas, arq):
+    for linha in linhas:
+        arq.write((json.dumps(linha, ensure_ascii=False) + "\n").encode("utf-8"))
+
+
+def _gravar_parquet(linhas, arq):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    esquema = pa.schema([(c, pa.int64() if c in COLUNAS_INTEIRAS else pa.string()) for c in COLUNAS])
+    with pq.ParquetWriter(arq, esquema) as w:
+        grupo = []
+        for linha in linhas:
+            grupo.append(linha)
+            if len(grupo) == LINHAS_POR_GRUPO_PARQUET:
+                w.write_table(pa.Table.from_pylist(grupo, schema=esquema))
+                grupo = []
+        if grupo:
+            w.write_table(pa.Table.from_pylist(grupo, schema=esquema))
+
+
+_GRAVADORES = {"xlsx": _gravar_xlsx, "csv": _gravar_csv, "jsonl": _gravar_jsonl, "parquet": _gravar_parquet}
+
+
+def exportar(itens, destino, formato):
+    """Grava as questões de `itens` (consumido uma única vez) em `destino`, um caminho ou arquivo binário.
+
+    Devolve (quantidade, maior id exportado). Lança ValueError para formatos desconhecidos.
+    """
+    if formato not in _GRAVADORES:
+        raise ValueError(f"Formato de exportação não suportado: {formato}")
+    contagem = {"quantidade": 0, "ultimo_id": 0}
+
+    def linhas():
+        for item in itens:
+            contagem["quantidade"] += 1
+            contagem["ultimo_id"] = max(contagem["ultimo_id"], item["id"])
+            yield linha_exportacao(item)
+
+    with (open(destino, "wb") if isinstance(destino, str) else nullcontext(destino)) as arq:
+        _GRAVADORES[formato](linhas(), arq)
+    return contagem["quantidade"], contagem["ultimo_id"]
+
+
+def exportar_banco(banco, destino, formato, filtros=None, incremental=False, registrar=True):
+    """Exporta as questões do banco que atendem a `filtros` (busca, area, curso, nivel_bloom).
+
+    Com `incremental`, só as gravadas depois da última exportação com os mesmos filtros. Com `registrar`, a
+    exportação passa a ser a referência da próxima incremental. Devolve (quantidade, ultimo_id).
+    """
+    filtros = filtros or {}
+    apos_id = (banco.ultima_exportacao(filtros) or {}).get("ultimo_id", 0) if incremental else 0
+    quantidade, ultimo_id = exportar(banco.iterar(**filtros, apos_id=apos_id), destino, formato)
+    ultimo_id = max(ultimo_id, apos_id)
+    if registrar:
+        banco.registrar_exportacao(formato, filtros, ultimo_id, quantidade)
+    return quantidade, ultimo_id
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Exporta o banco de questões ENADE em XLSX, CSV, JSONL ou Parquet.")
+    ap.add_argument("-o", "--saida", required=True, help="arquivo de saída")
+    ap.add_argument("--formato", choices=list(FORMATOS), default=None, help="padrão: pela extensão do arquivo de saída")
+    ap.add_argument("--busca", default="", help="palavras do título, assunto ou texto")
+    ap.add_argument("--area", default=None)
+    ap.add_argument("--curso", default=None)
+    ap.add_argument("--nivel-bloom", default=None)
+    ap.add_argument("--desde-ultima", action="store_true", help="só as questões gravadas depois da última exportação com os mesmos filtros")
+    args = ap.parse_args(argv)
+
+    formato = args.formato or os.path.splitext(args.saida)[1].lstrip(".").lower()
+    if formato not in FORMATOS:
+        ap.error(f"não foi possível deduzir o formato de '{args.saida}'; use --formato")
+    if formato not in formatos_disponiveis():
+        ap.error(f"o formato {formato} requer o pacote pyarrow")
+    filtros = {"busca": args.busca, "area": args.area, "curso": args.curso, "nivel_bloom": args.nivel_bloom}
+    quantidade, _ = exportar_banco(BancoQuestoes(CAMINHO_BANCO), args.saida, formato, filtros, incremental=args.desde_ultima)
+    print(f"{quantidade} questões exportadas → {args.saida}", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,284 @@
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from cache_disco import chave_llm
+from documentos import dividir_em_blocos
+from metricas import METRICAS, Metricas
+
+# Núcleo do gerador, sem dependência do Streamlit: usado pela interface (questosEnade.py) e pelo lote (lote.py).
+
+# --- CONSTANTES ---
+AREAS_ENADE = {
+    "Ciências Sociais Aplicadas": ["Direito", "Administração", "Ciências Contábeis", "Jornalismo", "Publicidade e Propaganda", "Turismo"],
+    "Engenharias": ["Engenharia de Software", "Engenharia Civil", "Engenharia de Produção", "Engenharia Elétrica", "Engenharia Mecânica"],
+    "Ciências da Saúde": ["Medicina", "Enfermagem", "Farmácia", "Fisioterapia", "Nutrição"],
+    "Ciências Humanas": ["Pedagogia", "História", "Letras", "Psicologia"],
+}
+BLOOM_LEVELS = ["Lembrar", "Compreender", "Aplicar", "Analisar", "Avaliar", "Criar"]
+BLOOM_VERBS = {
+    "Lembrar": ["definir", "listar", "identificar", "recordar", "nomear", "reconhecer"],
+    "Compreender": ["explicar", "resumir", "interpretar", "classificar", "descrever", "discutir"],
+    "Aplicar": ["usar", "implementar", "executar", "demonstrar", "resolver", "calcular"],
+    "Analisar": ["diferenciar", "organizar", "atribuir", "comparar", "examinar", "categorizar"],
+    "Avaliar": ["julgar", "criticar", "justificar", "avaliar", "defender", "recomendar"],
+    "Criar": ["projetar", "construir", "formular", "sintetizar", "planejar", "desenvolver"]
+}
+TIPOS_QUESTAO = {
+    "Múltipla Escolha Tradicional": "Enunciado com 5 alternativas (A, B, C, D, E), sendo apenas uma correta.",
+    "Complementação": "Frase com uma ou mais lacunas (___) que devem ser preenchidas por uma das alternativas.",
+    "Afirmação-Razão": "Duas asserções (I e II) ligadas por 'PORQUE'. O aluno avalia a veracidade de ambas e a relação entre elas.",
+    "Resposta Múltipla": "Apresenta várias afirmativas (I, II, III...). O aluno deve selecionar a alternativa que indica quais estão corretas."
+}
+INSTRUCOES_POR_TIPO = {
+    "Múltipla Escolha Tradicional": "Gere um enunciado e 5 alternativas (A, B, C, D, E), onde apenas uma é correta. Forneça o gabarito e as justificativas para todas as 5 alternativas.",
+    "Afirmação-Razão": "Gere duas asserções (I e II) ligadas pela palavra 'PORQUE'. As alternativas devem seguir o modelo padrão do ENADE para este tipo de questão (A. As duas são verdadeiras e a II justifica a I; B. As duas são verdadeiras, mas a II não justifica a I; etc.). Forneça o gabarito e uma justificativa detalhada para a resposta correta.",
+    "Resposta Múltipla": "Gere 3 ou 4 afirmativas numeradas com algarismos romanos (I, II, III, IV). As alternativas de A a E devem ser combinações que avaliam quais afirmativas estão corretas (Ex: A. Apenas I está correta. B. Apenas I e III estão corretas. etc.).",
+    "Complementação": "Gere um enunciado com uma ou mais lacunas indicadas por '________'. As alternativas (A a E) devem conter os termos que preenchem as lacunas de forma correta e coerente. Apenas uma alternativa deve estar totalmente correta."
+}
+PROVEDORES = {"openai": "OpenAI (GPT)", "gemini": "Google (Gemini)"}
+REF_GERADA_IA = "Texto gerado por IA."
+SYS_P_ANALISE = "Você é um avaliador de itens do ENADE..." # Prompt de análise
+
+FORMATO_JSON_QUESTAO = (
+    'Responda APENAS com um objeto JSON com as chaves: "enunciado" (texto, incluindo asserções ou afirmativas quando o tipo exigir), '
+    '"alternativas" (objeto com as chaves "A", "B", "C", "D" e "E"), "gabarito" (a letra da alternativa correta) e '
+    '"justificativas" (objeto com as chaves "A" a "E", explicando por que cada alternativa está correta ou incorreta).'
+)
+
+DIR_DADOS = os.environ.get("ENADE_DADOS_DIR", ".dados")
+CAMINHO_CACHE_LLM = os.path.join(DIR_DADOS, "cache_llm.sqlite3")
+CAMINHO_BANCO = os.path.join(DIR_DADOS, "banco_questoes.sqlite3")
+
+# --- PROMPTS ---
+def prompt_texto_base(curso, assunto, perfil, competencia):
+    return [
+        {"role": "system", "content": f"Você é um docente especialista do curso de {curso} que cria textos-base para questões do ENADE. Os textos devem ser contextualizados, apresentar uma situação-problema e ser perfeitamente alinhados às diretrizes pedagógicas."},
+        {"role": "user", "content": f"Elabore um texto-base (entre 150 e 250 palavras) para uma questão do ENADE sobre '{assunto}'. O texto deve ser uma situação-problema voltada a um egresso com o perfil: '{perfil}'. A avaliação focará na competência: '{competencia}'. O texto deve ser técnico e denso. Não inclua enunciado ou alternativas, apenas o texto-base."}
+    ]
+
+def prompt_geracao(area, curso, assunto, perfil, competencia, question_type, dificuldade, niv, texto_base, ref_final):
+    sys_p_geracao = f"""
+    Você é um docente especialista em produzir questões no estilo ENADE.
+    A partir do TEXTO-BASE e da REFERÊNCIA que serão fornecidos, sua tarefa é criar **apenas** o conteúdo da questão (ENUNCIADO, ALTERNATIVAS, GABARITO, JUSTIFICATIVAS), seguindo a regra específica para o tipo de questão solicitado.
+
+    REGRAS GERAIS:
+    - A questão deve ser inédita e alinhada à encomenda.
+    - O enunciado deve ser claro e afirmativo. Proibido pedir a 'incorreta'.
+    - **NÃO** inclua o TEXTO-BASE ou a REFERÊNCIA na sua resposta. Gere apenas o conteúdo da questão.
+    - As alternativas poderiam ser ligeiramente reformuladas para evitar que a resposta correta seja facilmente identificada apenas pela eliminação das alternativas claramente incorretas. Isto é, a alternativa incorreta deve apresentar um argumento sutilmente plausível, mas ainda incorreto.
+
+    REGRA ESPECÍFICA PARA O TIPO DE QUESTÃO '{question_type}':
+    {INSTRUCOES_POR_TIPO[question_type]}
+
+    FORMATO DA RESPOSTA:
+    {FORMATO_JSON_QUESTAO}
+    """
+    usr_p_geracao = f"""
+    GERAR CONTEÚDO DA QUESTÃO ENADE:
+    - Área: {area}, Curso: {curso}, Assunto: {assunto}
+    - Perfil: {perfil}, Competência: {competencia}
+    - Tipo: {question_type}, Dificuldade: {dificuldade}/5, Nível Bloom: {niv}
+    ---
+    TEXTO-BASE PARA SUA ANÁLISE (NÃO COPIAR NA RESPOSTA):
+    {texto_base}
+    REFERÊNCIA (NÃO COPIAR NA RESPOSTA):
+    {ref_final}
+    """
+    return [{"role": "system", "content": sys_p_geracao}, {"role": "user", "content": usr_p_geracao}]
+
+def prompt_geracao_distinta(prompts_geracao, questao_existente):
+    """Acrescenta ao prompt de geração a questão já existente que a nova não deve repetir."""
+    return prompts_geracao + [{"role": "user", "content": f"Já existe no banco uma questão muito parecida com a que você geraria. Crie uma questão com abordagem, enunciado e alternativas claramente diferentes desta:\n\n{questao_existente[:1500]}"}]
+
+def prompt_analise(questao_completa):
+    return [{"role": "system", "content": SYS_P_ANALISE}, {"role": "user", "content": questao_completa}]
+
+# Refinamentos sobre a questão estruturada: só a parte afetada vai no prompt e volta na resposta.
+def _json_questao(questao, campos):
+    return json.dumps({c: getattr(questao, c) for c in campos}, ensure_ascii=False, indent=1)
+
+def prompt_refino_dificuldade(questao):
+    # O texto-base vai só como contexto de leitura: a versão mais difícil precisa continuar respondível a partir dele.
+    return [{"role": "user", "content": f"Reescreva a questão a seguir para torná-la significativamente mais difícil, exigindo maior nível de análise, com distratores mais plausíveis. "
+                                        f"A questão continua baseada no TEXTO-BASE abaixo, que não muda e não deve ser reescrito nem devolvido: não cobre fatos que não estejam nele ou que não decorram dele. {FORMATO_JSON_QUESTAO}"
+                                        f"\n\nTEXTO-BASE (SOMENTE LEITURA):\n{questao.texto_base}\n\nQUESTÃO ATUAL:\n{_json_questao(questao, ('enunciado', 'alternativas', 'gabarito'))}"}]
+
+def prompt_refino_enunciado(questao):
+    return [{"role": "user", "content": f"Reescreva o ENUNCIADO a seguir de forma mais simples, clara e direta, sem alterar o que é pedido nem a resposta correta. Responda apenas com o novo enunciado, sem comentários.\n\nENUNCIADO ATUAL:\n{questao.enunciado}"}]
+
+def prompt_refino_alternativas(questao, question_type):
+    instrucao = INSTRUCOES_POR_TIPO.get(question_type, "")
+    # As alternativas atuais entram no prompt: a nova geração precisa ser diferente delas (e a chave do cache muda a cada versão).
+    return [{"role": "user", "content": f"Mantenha o enunciado a seguir e gere um conjunto completamente novo de ALTERNATIVAS (A a E), diferente das atuais, com apenas uma correta e distratores plausíveis. {instrucao} "
+                                        f'Responda APENAS com um objeto JSON com as chaves "alternativas" (objeto com as chaves "A" a "E"), "gabarito" (a letra correta) e "justificativas" (objeto com as chaves "A" a "E").'
+                                        f"\n\nENUNCIADO:\n{questao.enunciado}\n\nALTERNATIVAS ATUAIS (NÃO REPETIR):\n{_json_questao(questao, ('alternativas', 'gabarito'))}"}]
+
+def prompt_resumo_upload(texto, assunto, curso):
+    return [
+        {"role": "system", "content": "Você é um especialista em resumir textos para serem usados como base em questões do ENADE."},
+        {"role": "user", "content": f"Resuma o texto a seguir em um parágrafo coeso de até 200 palavras, focando nos pontos essenciais para uma questão sobre '{assunto}' no curso de {curso}.\n\nTEXTO:\n{texto}"}
+    ]
+
+def prompt_resumo_web(conteudo, assunto):
+    return [
+        {"role": "system", "content": "Você resume conteúdos da web para serem usados como base em questões do ENADE."},
+        {"role": "user", "content": f"Resuma o conteúdo a seguir em um parágrafo (até 200 palavras) que sirva como situação-problema sobre '{assunto}'.\n\nConteúdo:\n{conteudo}"}
+    ]
+
+def prompt_resumo_bloco(bloco, assunto, curso):
+    return [
+        {"role": "system", "content": "Você resume trechos de documentos longos que depois serão combinados em um texto-base para questões do ENADE."},
+        {"role": "user", "content": f"Resuma o trecho a seguir em até 120 palavras, preservando fatos, dados e conceitos relevantes para '{assunto}' no curso de {curso}. Se o trecho não tiver relação com o assunto, responda apenas 'IRRELEVANTE'.\n\nTRECHO:\n{bloco}"}
+    ]
+
+def prompt_fusao_resumos(resumos, assunto, curso):
+    partes = "\n\n".join(f"[Parte {i}]\n{r}" for i, r in enumerate(resumos, 1))
+    return [
+        {"role": "system", "content": "Você é um especialista em resumir textos para serem usados como base em questões do ENADE."},
+        {"role": "user", "content": f"Os resumos abaixo cobrem, em ordem, todas as partes de um documento. Combine-os em um parágrafo coeso de até 200 palavras, focando nos pontos essenciais para uma questão sobre '{assunto}' no curso de {curso}.\n\nRESUMOS:\n{partes}"}
+    ]
+
+# --- CLIENTES REUTILIZÁVEIS ---
+# Um cliente por chave mantém o pool HTTP (keep-alive) entre chamadas, evitando novo handshake TLS a cada requisição.
+# Os SDKs são importados só quando o provedor é usado: uma sessão só com OpenAI não carrega o do Gemini, e vice-versa.
+@lru_cache(maxsize=16)
+def cliente_openai(api_key):
+    from openai import OpenAI
+    return OpenAI(api_key=api_key)
+
+@lru_cache(maxsize=16)
+def cliente_gemini(api_key):
+    # Cliente próprio por chave: o `genai.configure` global faria todos os usuários de um mesmo modelo
+    # compartilharem a chave de quem o usou primeiro.
+    from google.ai import generativelanguage as glm
+    return glm.GenerativeServiceClient(client_options={"api_key": api_key})
+
+@lru_cache(maxsize=32)
+def modelo_gemini(api_key, mdl):
+    import google.generativeai as genai
+    modelo = genai.GenerativeModel(mdl)
+    # O SDK cria o cliente na primeira chamada a partir da configuração global; já entregamos o da chave.
+    modelo._client = cliente_gemini(api_key)
+    return modelo
+
+def _config_gemini(temperature, max_tokens, formato_json=False):
+    import google.generativeai as genai
+    return genai.GenerationConfig(temperature=temperature, max_output_tokens=max_tokens, response_mime_type="application/json" if formato_json else "text/plain")
+
+def _prompt_gemini(prompts):
+    return "\n".join(f"**{p['role']}**: {p['content']}" for p in prompts)
+
+# --- CHAMADAS AO PROVEDOR ---
+def _uso_openai(uso, usage):
+    if uso is not None and usage is not None:
+        uso["tokens_prompt"], uso["tokens_saida"] = usage.prompt_tokens, usage.completion_tokens
+
+def _uso_gemini(uso, resp):
+    meta = getattr(resp, "usage_metadata", None)
+    if uso is not None and meta is not None:
+        uso["tokens_prompt"], uso["tokens_saida"] = meta.prompt_token_count, meta.candidates_token_count
+
+def chamar_provedor(prompts, prov, mdl, api_key, temperature=0.7, max_tokens=2000, formato_json=False, uso=None):
+    """Faz a chamada ao provedor e devolve o texto da resposta. Erros do SDK são propagados.
+
+    Com `formato_json`, o provedor é instruído a devolver um objeto JSON (o prompt deve pedir JSON).
+    Se `uso` for um dicionário, recebe os tokens de prompt e de saída informados pelo provedor.
+    """
+    if prov.startswith("OpenAI"):
+        r = cliente_openai(api_key).chat.completions.create(model=mdl, messages=prompts, temperature=temperature, max_tokens=max_tokens,
+                                                            response_format={"type": "json_object" if formato_json else "text"})
+        _uso_openai(uso, r.usage)
+        return r.choices[0].message.content.strip()
+    resp = modelo_gemini(api_key, mdl).generate_content(_prompt_gemini(prompts), generation_config=_config_gemini(temperature, max_tokens, formato_json))
+    _uso_gemini(uso, resp)
+    return resp.text
+
+def chamar_provedor_stream(prompts, prov, mdl, api_key, temperature=0.7, max_tokens=2000, uso=None):
+    """Gerador que devolve os trechos da resposta à medida que chegam do provedor."""
+    if prov.startswith("OpenAI"):
+        r = cliente_openai(api_key).chat.completions.create(model=mdl, messages=prompts, temperature=temperature, max_tokens=max_tokens, response_format={"type": "text"},
+                                                            stream=True, stream_options={"include_usage": True})
+        for chunk in r:
+            # O último pedaço não traz texto, só o uso de tokens.
+            _uso_openai(uso, getattr(chunk, "usage", None))
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+        return
+    resp = modelo_gemini(api_key, mdl).generate_content(_prompt_gemini(prompts), generation_config=_config_gemini(temperature, max_tokens), stream=True)
+    for chunk in resp:
+        _uso_gemini(uso, chunk)
+        if chunk.text:
+            yield chunk.text
+
+def gerar_resposta(prompts, prov, mdl, api_key, temperature=0.7, max_tokens=2000, cache=None, usar_cache=True, formato_json=False, etapa="llm",
+                   antes_de_chamar=None):
+    """Como `chamar_provedor`, mas consulta/grava o cache em disco quando fornecido e registra a chamada em METRICAS sob `etapa`.
+
+    `antes_de_chamar`, se informado, é executado só quando o provedor vai de fato ser chamado (ex.: limitador de taxa).
+    """
+    with METRICAS.medir(etapa, prov, mdl) as reg:
+        chave = chave_llm(prov, mdl, prompts, temperature, max_tokens)
+        if cache is not None and usar_cache:
+            em_cache = cache.obter(chave)
+            if em_cache is not None:
+                reg["cache_hit"] = True
+                return em_cache
+        if antes_de_chamar is not None:
+            antes_de_chamar()
+        resp = chamar_provedor(prompts, prov, mdl, api_key, temperature, max_tokens, formato_json, uso=reg)
+        # Mesmo quando o cache é ignorado na leitura, a variação nova substitui a anterior.
+        if resp and cache is not None:
+            cache.gravar(chave, resp)
+        return resp
+
+def gerar_resposta_stream(prompts, prov, mdl, api_key, temperature=0.7, max_tokens=2000, cache=None, usar_cache=True, etapa="llm"):
+    """Versão em streaming de `gerar_resposta`: um acerto no cache é devolvido como um único trecho."""
+    with METRICAS.medir(etapa, prov, mdl) as reg:
+        chave = chave_llm(prov, mdl, prompts, temperature, max_tokens)
+        if cache is not None and usar_cache:
+            em_cache = cache.obter(chave)
+            if em_cache is not None:
+                reg["cache_hit"] = True
+                yield em_cache
+                return
+        partes = []
+        for trecho in chamar_provedor_stream(prompts, prov, mdl, api_key, temperature, max_tokens, uso=reg):
+            Metricas.marcar_primeiro_token(reg)
+            partes.append(trecho)
+            yield trecho
+        resp = "".join(partes).strip()
+        if resp and cache is not None:
+            cache.gravar(chave, resp)
+
+# --- RESUMO DE DOCUMENTOS LONGOS (map-reduce) ---
+# Teto de chamadas por rodada: documentos enormes ganham blocos maiores em vez de mais chamadas.
+MAX_BLOCOS_RESUMO = 24
+
+def resumir_blocos(texto, assunto, curso, prov, mdl, api_key, cache=None, usar_cache=True, tamanho_bloco=4000, concorrencia=4):
+    """Resume os blocos do texto em paralelo até que os resumos caibam em um único bloco; a fusão final fica com quem chama.
+
+    Blocos cuja chamada falha são descartados; o erro só é propagado se nenhum bloco puder ser resumido.
+    """
+    tamanho_bloco = max(tamanho_bloco, -(-len(texto) // MAX_BLOCOS_RESUMO))
+    erros = []
+
+    def resumir(bloco):
+        try:
+            return gerar_resposta(prompt_resumo_bloco(bloco, assunto, curso), prov, mdl, api_key, temperature=0.3, max_tokens=300,
+                                  cache=cache, usar_cache=usar_cache, etapa="resumo (bloco)")
+        except Exception as e:
+            erros.append(e)
+            return None
+
+    resumos = dividir_em_blocos(texto, tamanho_bloco)
+    with ThreadPoolExecutor(max_workers=concorrencia) as pool:
+        while True:
+            erros.clear()
+            resumos = [r for r in pool.map(resumir, resumos) if r and r.strip().upper() != "IRRELEVANTE"]
+            if not resumos and erros:
+                raise erros[0]
+            if sum(len(r) for r in resumos) <= tamanho_bloco or len(resumos) <= 1:
+                return resumos
+            # Ainda grande demais para a fusão: reagrupa os resumos e faz mais uma rodada.
+            resumos = dividir_em_blocos("\n\n".join(resumos), tamanho_bloco)
@@ -0,0 +1,169 @@
+"""Geração em lote (sem interface) de questões ENADE.
+
+Uso:
+    python lote.py tarefas.csv -o questoes.jsonl --provedor openai --modelo gpt-4o-mini --concorrencia 8 --rpm 60
+
+Cada linha do arquivo de tarefas (CSV ou JSONL) descreve uma questão com as colunas:
+area, curso, assunto, perfil, competencia, tipo, dificuldade, nivel_bloom e, opcionalmente,
+texto_base e referencia. Sem texto_base, ele é gerado pela IA como na interface.
+"""
+import argparse
+import csv
+import json
+import os
+import sys
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from banco import BancoQuestoes
+from cache_disco import CacheDisco
+from contexto import estimar_tokens
+from gerador import (AREAS_ENADE, BLOOM_LEVELS, TIPOS_QUESTAO, PROVEDORES, CAMINHO_CACHE_LLM, CAMINHO_BANCO, REF_GERADA_IA,
+                     prompt_texto_base, prompt_geracao, prompt_analise, gerar_resposta)
+from questao import Questao
+
+CAMPOS_OBRIGATORIOS = ["area", "curso", "assunto", "perfil", "competencia", "tipo"]
+VARIAVEL_CHAVE = {"openai": "OPENAI_API_KEY", "gemini": "GOOGLE_API_KEY"}
+
+
+class LimitadorTaxa:
+    """Janela deslizante de 60 s que limita requisições e tokens por minuto de um provedor."""
+
+    def __init__(self, rpm=None, tpm=None):
+        self.rpm = rpm
+        self.tpm = tpm
+        self._eventos = deque()  # (instante, tokens)
+        self._tokens = 0
+        self._cond = threading.Condition()
+
+    def aguardar(self, tokens):
+        if not self.rpm and not self.tpm:
+            return
+        with self._cond:
+            while True:
+                agora = time.monotonic()
+                while self._eventos and agora - self._eventos[0][0] >= 60:
+                    self._tokens -= self._eventos.popleft()[1]
+                cabe_rpm = not self.rpm or len(self._eventos) < self.rpm
+                # Uma requisição maior que o limite inteiro passa sozinha para não travar o lote.
+                cabe_tpm = not self.tpm or not self._eventos or self._tokens + tokens <= self.tpm
+                if cabe_rpm and cabe_tpm:
+                    self._eventos.append((agora, tokens))
+                    self._tokens += tokens
+                    return
+                self._cond.wait(timeout=max(0.05, 60 - (agora - self._eventos[0][0])))
+
+
+def tokens_da_chamada(prompts, max_tokens):
+    # Tokens de entrada estimados mais o máximo de saída reservado.
+    return sum(estimar_tokens(p["content"]) for p in prompts) + max_tokens
+
+
+def ler_tarefas(caminho):
+    with open(caminho, encoding="utf-8") as f:
+        if caminho.lower().endswith(".csv"):
+            tarefas = list(csv.DictReader(f))
+        else:
+            tarefas = [json.loads(linha) for linha in f if linha.strip()]
+    for i, t in enumerate(tarefas, 1):
+        faltando = [c for c in CAMPOS_OBRIGATORIOS if not t.get(c)]
+        if faltando:
+            raise ValueError(f"Tarefa {i}: campos ausentes: {', '.join(faltando)}")
+        if t["area"] not in AREAS_ENADE or t["curso"] not in AREAS_ENADE[t["area"]]:
+            raise ValueError(f"Tarefa {i}: área/curso inválidos: {t['area']} / {t['curso']}")
+        if t["tipo"] not in TIPOS_QUESTAO:
+            raise ValueError(f"Tarefa {i}: tipo de questão inválido: {t['tipo']}")
+        t["nivel_bloom"] = t.get("nivel_bloom") or "Analisar"
+        if t["nivel_bloom"] not in BLOOM_LEVELS:
+            raise ValueError(f"Tarefa {i}: nível Bloom inválido: {t['nivel_bloom']}")
+        t["dificuldade"] = int(t.get("dificuldade") or 3)
+    return tarefas
+
+
+def processar_tarefa(tarefa, prov, mdl, api_key, limitador, cache=None):
+    """Executa texto-base (se necessário) → geração → análise para uma tarefa e devolve o item gerado."""
+    def chamar(prompts, **kw):
+        # Acertos no cache não consomem a cota de RPM/TPM: só espera quem vai chamar o provedor.
+        aguardar = lambda: limitador.aguardar(tokens_da_chamada(prompts, kw.get("max_tokens", 2000)))
+        return gerar_resposta(prompts, prov, mdl, api_key, cache=cache, antes_de_chamar=aguardar, **kw)
+
+    texto_base = tarefa.get("texto_base") or ""
+    ref_final = tarefa.get("referencia") or ""
+    if not texto_base:
+        texto_base = chamar(prompt_texto_base(tarefa["curso"], tarefa["assunto"], tarefa["perfil"], tarefa["competencia"]),
+                            temperature=0.6, max_tokens=400, etapa="texto-base")
+        ref_final = REF_GERADA_IA
+    # A geração nunca lê o cache: tarefas repetidas (o jeito de pedir N questões do mesmo assunto) devem gerar questões distintas.
+    resposta = chamar(prompt_geracao(tarefa["area"], tarefa["curso"], tarefa["assunto"], tarefa["perfil"], tarefa["competencia"],
+                                     tarefa["tipo"], tarefa["dificuldade"], tarefa["nivel_bloom"], texto_base, ref_final),
+                      formato_json=True, usar_cache=False, etapa="geração")
+    questao = Questao.da_resposta(resposta, texto_base, ref_final)
+    questao_completa = questao.texto_completo()
+    analise_qualidade = chamar(prompt_analise(questao_completa), temperature=0.3, etapa="análise")
+    return {
+        "titulo": f"{tarefa['curso']} - {tarefa['assunto'][:25]}...",
+        "texto_completo": questao_completa,
+        "analise_qualidade": analise_qualidade,
+        "estrutura": questao.para_dict(),
+        "contexto": {"area": tarefa["area"], "curso": tarefa["curso"], "assunto": tarefa["assunto"], "perfil": tarefa["perfil"],
+                     "competencia": tarefa["competencia"], "texto_base": texto_base, "tipo": tarefa["tipo"],
+                     "dificuldade": tarefa["dificuldade"], "nivel_bloom": tarefa["nivel_bloom"]},
+    }
+
+
+def executar_lote(tarefas, saida, prov, mdl, api_key, concorrencia=4, rpm=None, tpm=None, cache=None, banco=None):
+    """Processa as tarefas em paralelo e grava cada resultado em JSONL (e no banco, se fornecido) assim que fica pronto. Devolve (ok, falhas)."""
+    limitador = LimitadorTaxa(rpm, tpm)
+    lock_saida = threading.Lock()
+    ok = falhas = 0
+    with open(saida, "a", encoding="utf-8") as f, ThreadPoolExecutor(max_workers=concorrencia) as pool:
+        futuros = {pool.submit(processar_tarefa, t, prov, mdl, api_key, limitador, cache): i for i, t in enumerate(tarefas, 1)}
+        for fut in as_completed(futuros):
+            i = futuros[fut]
+            try:
+                item = fut.result()
+                if banco is not None:
+                    item["id"] = banco.inserir(item)
+                registro = {"tarefa": i, **item}
+                ok += 1
+            except Exception as e:
+                registro = {"tarefa": i, "erro": str(e)}
+                falhas += 1
+            with lock_saida:
+                f.write(json.dumps(registro, ensure_ascii=False) + "\n")
+                f.flush()
+            print(f"[{ok + falhas}/{len(tarefas)}] tarefa {i}: {'erro' if 'erro' in registro else 'ok'}", file=sys.stderr)
+    return ok, falhas
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Gera questões ENADE em lote a partir de um arquivo de tarefas (CSV/JSONL).")
+    ap.add_argument("tarefas", help="arquivo .csv ou .jsonl com as tarefas")
+    ap.add_argument("-o", "--saida", default="questoes_lote.jsonl", help="arquivo JSONL de saída (acrescenta ao final)")
+    ap.add_argument("--provedor", choices=list(PROVEDORES), default="openai")
+    ap.add_argument("--modelo", default="gpt-4o-mini")
+    ap.add_argument("--api-key", default=None, help="chave de API (padrão: OPENAI_API_KEY / GOOGLE_API_KEY)")
+    ap.add_argument("--concorrencia", type=int, default=4, help="número de tarefas simultâneas")
+    ap.add_argument("--rpm", type=int, default=None, help="limite de requisições por minuto no provedor")
+    ap.add_argument("--tpm", type=int, default=None, help="limite (estimado) de tokens por minuto no provedor")
+    ap.add_argument("--sem-cache", action="store_true", help="não usar o cache de respostas em disco")
+    ap.add_argument("--salvar-no-banco", action="store_true", help="gravar também no banco de questões da interface")
+    args = ap.parse_args(argv)
+
+    api_key = args.api_key or os.environ.get(VARIAVEL_CHAVE[args.provedor])
+    if not api_key:
+        ap.error(f"informe --api-key ou defina {VARIAVEL_CHAVE[args.provedor]}")
+    tarefas = ler_tarefas(args.tarefas)
+    cache = None if args.sem_cache else CacheDisco(CAMINHO_CACHE_LLM)
+    banco = BancoQuestoes(CAMINHO_BANCO) if args.salvar_no_banco else None
+    inicio = time.monotonic()
+    ok, falhas = executar_lote(tarefas, args.saida, PROVEDORES[args.provedor], args.modelo, api_key,
+                               args.concorrencia, args.rpm, args.tpm, cache, banco)
+    print(f"{ok} questões geradas, {falhas} falhas em {time.monotonic() - inicio:.1f}s → {args.saida}", file=sys.stderr)
+    return 1 if falhas else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
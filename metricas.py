@@ -0,0 +1,71 @@
+import json
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+# Instrumentação por etapa do pipeline: tempo total, tempo até o primeiro token, tokens, acertos de cache e erros.
+
+
+class Metricas:
+    """Registros em memória (limitados aos mais recentes), compartilhados pelo processo e seguros entre threads."""
+
+    def __init__(self, max_registros=10000):
+        self._registros = deque(maxlen=max_registros)
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def medir(self, etapa, prov="", mdl=""):
+        """Mede o bloco; quem chama pode preencher no dicionário devolvido ttft, tokens_prompt, tokens_saida e cache_hit."""
+        reg = {"etapa": etapa, "provedor": prov, "modelo": mdl, "inicio": time.time(), "cache_hit": False, "erro": None}
+        t0 = time.perf_counter()
+        reg["_t0"] = t0
+        try:
+            yield reg
+        except BaseException as e:
+            reg["erro"] = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            reg.pop("_t0", None)
+            reg["duracao"] = time.perf_counter() - t0
+            reg.setdefault("ttft", reg["duracao"])
+            with self._lock:
+                self._registros.append(reg)
+
+    @staticmethod
+    def marcar_primeiro_token(reg):
+        if "ttft" not in reg and "_t0" in reg:
+            reg["ttft"] = time.perf_counter() - reg["_t0"]
+
+    def registros(self):
+        with self._lock:
+            return list(self._registros)
+
+    def resumo(self):
+        """Agrega por (etapa, provedor, modelo): chamadas, erros, acertos de cache, tempos médios/p95 e tokens."""
+        grupos = {}
+        for r in self.registros():
+            grupos.setdefault((r["etapa"], r["provedor"], r["modelo"]), []).append(r)
+        linhas = []
+        for (etapa, prov, mdl), regs in sorted(grupos.items()):
+            duracoes = sorted(r["duracao"] for r in regs)
+            linhas.append({
+                "etapa": etapa, "provedor": prov, "modelo": mdl, "chamadas": len(regs),
+                "erros": sum(1 for r in regs if r["erro"]), "cache_hits": sum(1 for r in regs if r["cache_hit"]),
+                "tempo_medio_s": round(sum(duracoes) / len(duracoes), 3),
+                "tempo_p95_s": round(duracoes[min(len(duracoes) - 1, int(0.95 * len(duracoes)))], 3),
+                "ttft_medio_s": round(sum(r["ttft"] for r in regs) / len(regs), 3),
+                "tokens_prompt": sum(r.get("tokens_prompt") or 0 for r in regs),
+                "tokens_saida": sum(r.get("tokens_saida") or 0 for r in regs),
+            })
+        return linhas
+
+    def para_jsonl(self):
+        return "".join(json.dumps(r, ensure_ascii=False) + "\n" for r in self.registros())
+
+    def limpar(self):
+        with self._lock:
+            self._registros.clear()
+
+
+METRICAS = Metricas()
@@ -0,0 +1,107 @@
+import json
+import re
+from dataclasses import asdict, dataclass, replace
+
+# Modelo estruturado da questão: a IA responde em JSON e o texto completo é montado localmente,
+# permitindo que os refinamentos reescrevam só a parte afetada.
+
+LETRAS = "ABCDE"
+
+
+def montar_questao_completa(texto_base, ref_final, questao_parcial):
+    ref_formatada = f"Referência: {ref_final}\n\n" if ref_final and "gerado por IA" not in ref_final else ""
+    return f"TEXTO-BASE\n\n{texto_base}\n\n{ref_formatada}{questao_parcial}"
+
+
+def carregar_json(resposta):
+    """Lê o objeto JSON da resposta do modelo, tolerando cercas de código e texto ao redor."""
+    texto = re.sub(r"^```(?:json)?\s*|\s*```$", "", resposta.strip())
+    try:
+        dados = json.loads(texto)
+    except json.JSONDecodeError:
+        inicio, fim = texto.find("{"), texto.rfind("}")
+        if inicio < 0 or fim <= inicio:
+            raise ValueError("a resposta não contém um objeto JSON")
+        dados = json.loads(texto[inicio:fim + 1])
+    if not isinstance(dados, dict):
+        raise ValueError("a resposta não é um objeto JSON")
+    return dados
+
+
+def _por_letra(valor, campo):
+    if isinstance(valor, list):
+        valor = dict(zip(LETRAS, valor))
+    if not isinstance(valor, dict):
+        raise ValueError(f"'{campo}' deve ser um objeto com as letras A a E")
+    # Aceita chaves como "a", "A)" ou "Alternativa A".
+    normalizado = {}
+    for chave, texto in valor.items():
+        letra = re.findall(r"\b([A-Ea-e])\b", str(chave)) or [str(chave).strip()[:1]]
+        normalizado[letra[-1].upper()] = str(texto).strip()
+    return normalizado
+
+
+def validar_campos(dados, campos):
+    """Valida e normaliza os campos informados de uma resposta em JSON; devolve só esses campos."""
+    saida = {}
+    if "enunciado" in campos:
+        if not isinstance(dados.get("enunciado"), str) or not dados["enunciado"].strip():
+            raise ValueError("'enunciado' ausente ou vazio")
+        saida["enunciado"] = dados["enunciado"].strip()
+    if "alternativas" in campos:
+        alternativas = _por_letra(dados.get("alternativas"), "alternativas")
+        if sorted(alternativas) != list(LETRAS) or not all(alternativas.values()):
+            raise ValueError("'alternativas' deve ter exatamente as letras A a E, todas preenchidas")
+        saida["alternativas"] = alternativas
+    if "gabarito" in campos:
+        # Só a letra, opcionalmente como "C)" ou "Alternativa C": frases como "A correta é a C" são rejeitadas.
+        letra = re.fullmatch(r"(?:(?:alternativa|letra)\s+)?([A-Ea-e])\s*[).]?", str(dados.get("gabarito", "")).strip(), re.IGNORECASE)
+        if not letra:
+            raise ValueError(f"'gabarito' deve ser uma única letra de A a E, recebido: {dados.get('gabarito')!r}")
+        saida["gabarito"] = letra.group(1).upper()
+    if "justificativas" in campos:
+        justificativas = dados.get("justificativas")
+        if isinstance(justificativas, str):
+            justificativas = {saida.get("gabarito") or dados.get("gabarito", "A"): justificativas}
+        justificativas = _por_letra(justificativas, "justificativas")
+        invalidas = sorted(set(justificativas) - set(LETRAS))
+        if invalidas:
+            raise ValueError(f"'justificativas' com chaves fora de A a E: {', '.join(invalidas)}")
+        saida["justificativas"] = justificativas
+    return saida
+
+
+@dataclass
+class Questao:
+    texto_base: str
+    referencia: str
+    enunciado: str
+    alternativas: dict
+    gabarito: str
+    justificativas: dict
+
+    CAMPOS_QUESTAO = ("enunciado", "alternativas", "gabarito", "justificativas")
+
+    @classmethod
+    def da_resposta(cls, resposta, texto_base, referencia):
+        """Cria a questão a partir da resposta em JSON da geração. Lança ValueError se o formato for inválido."""
+        return cls(texto_base=texto_base, referencia=referencia, **validar_campos(carregar_json(resposta), cls.CAMPOS_QUESTAO))
+
+    def com_resposta(self, resposta, campos):
+        """Nova questão com `campos` substituídos pelos da resposta em JSON de um refinamento."""
+        return replace(self, **validar_campos(carregar_json(resposta), campos))
+
+    def parte_questao(self):
+        alternativas = "\n".join(f"{l}) {self.alternativas[l]}" for l in LETRAS)
+        justificativas = "\n".join(f"{l}) {self.justificativas[l]}" for l in LETRAS if self.justificativas.get(l))
+        return f"ENUNCIADO\n\n{self.enunciado}\n\nALTERNATIVAS\n\n{alternativas}\n\nGABARITO: {self.gabarito}\n\nJUSTIFICATIVAS\n\n{justificativas}"
+
+    def texto_completo(self):
+        return montar_questao_completa(self.texto_base, self.referencia, self.parte_questao())
+
+    def para_dict(self):
+        return asdict(self)
+
+    @classmethod
+    def de_dict(cls, dados):
+        return cls(**dados)
@@ -1,30 +1,22 @@
+import hashlib
+import os
+import tempfile
 import streamlit as st
-import requests
 from datetime import datetime
-from io import BytesIO
-from bs4 import BeautifulSoup
-from openai import OpenAI
-import google.generativeai as genai
-import PyPDF2
-from docx import Document
-import pandas as pd
-
-# --- CONSTANTES ---
-AREAS_ENADE = {
-    "Ciências Sociais Aplicadas": ["Direito", "Administração", "Ciências Contábeis", "Jornalismo", "Publicidade e Propaganda", "Turismo"],
-    "Engenharias": ["Engenharia de Software", "Engenharia Civil", "Engenharia de Produção", "Engenharia Elétrica", "Engenharia Mecânica"],
-    "Ciências da Saúde": ["Medicina", "Enfermagem", "Farmácia", "Fisioterapia", "Nutrição"],
-    "Ciências Humanas": ["Pedagogia", "História", "Letras", "Psicologia"],
-}
-BLOOM_LEVELS = ["Lembrar", "Compreender", "Aplicar", "Analisar", "Avaliar", "Criar"]
-BLOOM_VERBS = {
-    "Lembrar": ["definir", "listar", "identificar", "recordar", "nomear", "reconhecer"],
-    "Compreender": ["explicar", "resumir", "interpretar", "classificar", "descrever", "discutir"],
-    "Aplicar": ["usar", "implementar", "executar", "demonstrar", "resolver", "calcular"],
-    "Analisar": ["diferenciar", "organizar", "atribuir", "comparar", "examinar", "categorizar"],
-    "Avaliar": ["julgar", "criticar", "justificar", "avaliar", "defender", "recomendar"],
-    "Criar": ["projetar", "construir", "formular", "sintetizar", "planejar", "desenvolver"]
-}
+from cache_disco import CacheDisco
+from gerador import (AREAS_ENADE, BLOOM_LEVELS, TIPOS_QUESTAO, DIR_DADOS, CAMINHO_CACHE_LLM, CAMINHO_BANCO, REF_GERADA_IA,
+                     prompt_texto_base, prompt_geracao, prompt_geracao_distinta, prompt_analise,
+                     prompt_refino_dificuldade, prompt_refino_enunciado, prompt_refino_alternativas, gerar_resposta,
+                     gerar_resposta_stream, prompt_resumo_upload, prompt_resumo_web, prompt_fusao_resumos, resumir_blocos)
+from documentos import extrair_texto
+from contexto import selecionar_contexto, orcamento_contexto
+from dataclasses import replace
+from banco import BancoQuestoes
+from questao import Questao
+from metricas import METRICAS
+from duplicatas import IndiceDuplicatas, assinatura, texto_para_indice
+from busca_web import search_articles, extrair_conteudo_url, prefetch_artigos
+from exportacao import FORMATOS, formatos_disponiveis, exportar_banco
 
 # --- CONFIG STREAMLIT ---
 st.set_page_config(page_title="Gerador de Questões ENADE v3.5", page_icon="🎓", layout="wide")
@@ -36,9 +28,65 @@ st.session_state.setdefault("ref_final", "")
 st.session_state.setdefault("search_results", [])
 st.session_state.setdefault("perfil", "")
 st.session_state.setdefault("competencia", "")
-st.session_state.setdefault("questoes_geradas", []) 
-st.session_state.setdefault("selected_index", 0)
+st.session_state.setdefault("selected_id", None)
+st.session_state.setdefault("pagina_historico", 1)
 st.session_state.setdefault("fonte_info", {})
+st.session_state.setdefault("upload_processado", None)
+st.session_state.setdefault("prefetch", {})
+st.session_state.setdefault("exportacao", None)
+
+# --- CACHE DE RESPOSTAS DO LLM (compartilhado entre sessões e reinícios) ---
+@st.cache_resource
+def obter_cache_llm():
+    return CacheDisco(CAMINHO_CACHE_LLM)
+
+# Texto extraído e resumos de arquivos enviados, indexados pelo hash do conteúdo.
+@st.cache_resource
+def obter_cache_uploads():
+    return CacheDisco(os.path.join(DIR_DADOS, "cache_uploads.sqlite3"), max_itens=500, max_bytes=100 * 1024 * 1024, ttl=30 * 24 * 3600)
+
+# Artigos da web com seus validadores HTTP (ETag/Last-Modified).
+@st.cache_resource
+def obter_cache_web():
+    return CacheDisco(os.path.join(DIR_DADOS, "cache_web.sqlite3"), max_itens=2000, max_bytes=200 * 1024 * 1024)
+
+@st.cache_resource
+def obter_banco():
+    return BancoQuestoes(CAMINHO_BANCO)
+
+@st.cache_resource
+def obter_indice_duplicatas():
+    return IndiceDuplicatas()
+
+def buscar_duplicata(sig, ignorar=None):
+    """Devolve (id, similaridade) da questão mais parecida já gravada, ou None."""
+    indice = obter_indice_duplicatas()
+    indice.sincronizar(obter_banco())
+    similares = indice.consultar(sig, ignorar=ignorar)
+    return similares[0] if similares else None
+
+def salvar_refinamento(qid, texto_refinado, acao, texto_base, estrutura=None):
+    sig = assinatura(texto_para_indice(texto_refinado, texto_base))
+    obter_banco().atualizar_texto(qid, texto_refinado, acao, sig.tobytes(), estrutura.para_dict() if estrutura else None)
+    obter_indice_duplicatas().adicionar(qid, sig)
+
+def preparar_exportacao(formato, filtros, incremental):
+    """Gera o arquivo de exportação em disco, só quando pedido; a marca da exportação incremental é gravada ao baixar."""
+    anterior = st.session_state.exportacao
+    if anterior and os.path.exists(anterior["arquivo"]):
+        os.remove(anterior["arquivo"])
+    fd, arquivo = tempfile.mkstemp(prefix="exportacao_enade_", suffix=f".{formato}")
+    os.close(fd)
+    quantidade, ultimo_id = exportar_banco(obter_banco(), arquivo, formato, filtros, incremental, registrar=False)
+    sufixo = "_novas" if incremental else ""
+    st.session_state.exportacao = {"arquivo": arquivo, "formato": formato, "filtros": filtros, "quantidade": quantidade, "ultimo_id": ultimo_id,
+                                   "nome": f"banco_enade{sufixo}_{datetime.now():%Y%m%d_%H%M}.{formato}"}
+
+def registrar_exportacao(exp):
+    obter_banco().registrar_exportacao(exp["formato"], exp["filtros"], exp["ultimo_id"], exp["quantidade"])
+
+QUESTOES_POR_PAGINA = 20
+MAX_REGENERACOES_DUPLICATA = 2
 
 # --- SIDEBAR ---
 with st.sidebar:
@@ -49,91 +97,152 @@ with st.sidebar:
         modelo = st.selectbox("Modelo GPT", ["gpt-4o-mini", "gpt-4o", "gpt-3.5-turbo"])
     else:
         modelo = st.selectbox("Modelo Gemini", ["gemini-1.5-flash-latest", "gemini-1.5-pro-latest"])
+    usar_cache = st.toggle("♻️ Reutilizar respostas em cache", value=True, help="Chamadas idênticas (mesmo provedor, modelo, prompt e parâmetros) são atendidas pelo cache local.")
+    est_cache = obter_cache_llm().estatisticas()
+    st.caption(f"Cache: {est_cache['hits']} acertos · {est_cache['misses']} falhas · {est_cache['itens']} itens")
+    with st.expander("📊 Desempenho por etapa"):
+        resumo_metricas = METRICAS.resumo()
+        if not resumo_metricas:
+            st.caption("Nenhuma chamada registrada neste processo.")
+        else:
+            st.dataframe(resumo_metricas, hide_index=True, use_container_width=True)
+            st.download_button("Exportar métricas (.jsonl)", METRICAS.para_jsonl(), "metricas_enade.jsonl", use_container_width=True)
     st.info("Versão 3.5 de 10/07/2025.")
 
-    st.header("📜 Histórico da Sessão")
-    if not st.session_state.questoes_geradas:
-        st.caption("Nenhuma questão gerada nesta sessão.")
+    st.header("📜 Histórico de Questões")
+    banco = obter_banco()
+    busca_hist = st.text_input("Buscar no histórico", "", placeholder="Palavras do título, assunto ou texto")
+    area_hist = st.selectbox("Filtrar por área", ["Todas"] + list(AREAS_ENADE.keys()))
+    filtros_hist = {"busca": busca_hist, "area": None if area_hist == "Todas" else area_hist}
+    total_hist = banco.contar(**filtros_hist)
+    if not total_hist:
+        st.caption("Nenhuma questão encontrada." if busca_hist or filtros_hist["area"] else "Nenhuma questão gerada ainda.")
     else:
-        titulos = [q["titulo"] for q in st.session_state.questoes_geradas]
-        selected_title = st.radio(
-            "Selecione uma questão para ver/editar:",
-            options=titulos,
-            index=st.session_state.selected_index,
-            key="historico_radio"
+        n_paginas = (total_hist + QUESTOES_POR_PAGINA - 1) // QUESTOES_POR_PAGINA
+        pagina = st.number_input(f"Página (de {n_paginas})", min_value=1, max_value=n_paginas, value=min(st.session_state.pagina_historico, n_paginas), step=1)
+        st.session_state.pagina_historico = pagina
+        # Só a página atual é lida e renderizada: o custo do rerun não cresce com o tamanho do banco.
+        pagina_hist = dict(banco.listar(**filtros_hist, limite=QUESTOES_POR_PAGINA, offset=(pagina - 1) * QUESTOES_POR_PAGINA))
+        ids_pagina = list(pagina_hist)
+        selected_id = st.radio(
+            f"Selecione uma questão para ver/editar ({total_hist} no total):",
+            options=ids_pagina,
+            format_func=lambda i: pagina_hist[i],
+            index=ids_pagina.index(st.session_state.selected_id) if st.session_state.selected_id in pagina_hist else None,
+            key=f"historico_radio_{pagina}"
         )
-        st.session_state.selected_index = titulos.index(selected_title)
+        if selected_id is not None:
+            st.session_state.selected_id = selected_id
+
+        with st.expander("📦 Exportar questões"):
+            st.caption("Exporta as questões que atendem à busca e ao filtro de área acima, campo a campo.")
+            formato_exp = st.selectbox("Formato", formatos_disponiveis(), format_func=lambda f: FORMATOS[f][0])
+            ultima_exp = banco.ultima_exportacao(filtros_hist)
+            so_novas = st.checkbox("Só as novas desde a última exportação", disabled=ultima_exp is None,
+                                   help=f"Última exportação com estes filtros: {ultima_exp['criado_em']}." if ultima_exp else "Ainda não houve exportação com estes filtros.")
+            if st.button("Preparar exportação", use_container_width=True):
+                with st.spinner("Gerando arquivo..."):
+                    preparar_exportacao(formato_exp, filtros_hist, so_novas)
+            exp = st.session_state.exportacao
+            if exp and exp["formato"] == formato_exp and exp["filtros"] == filtros_hist and os.path.exists(exp["arquivo"]):
+                if not exp["quantidade"]:
+                    st.caption("Nenhuma questão nova desde a última exportação.")
+                else:
+                    with open(exp["arquivo"], "rb") as arq:
+                        st.download_button(f"📥 Baixar {exp['quantidade']} questões", arq, exp["nome"], FORMATOS[formato_exp][1],
+                                           use_container_width=True, on_click=registrar_exportacao, args=(exp,))
 
 if not st.session_state.api_key:
     st.warning("Informe a chave de API na lateral para continuar.")
     st.stop()
 
 # --- FUNÇÕES AUXILIARES ---
-@st.cache_data(ttl=3600)
-def extrair_conteudo_url(url: str):
-    try:
-        r = requests.get(url, headers={"User-Agent": "Mozilla/5.0"}, timeout=10)
-        r.raise_for_status()
-        soup = BeautifulSoup(r.text, "html.parser")
-        title = soup.title.string if soup.title else ""
-        author_meta = soup.find("meta", attrs={"name": "author"})
-        author = author_meta["content"] if author_meta else ""
-        for tag in soup(["script", "style", "nav", "footer", "header", "aside"]): tag.decompose()
-        return " ".join(soup.stripped_strings), title, author
-    except: return None, None, None
-
-def extrair_texto_upload(upload):
+# Quanto do arquivo é lido no modo padrão; o contexto enviado ao modelo é depois escolhido por relevância.
+LIMITE_LEITURA_UPLOAD = 100_000
+
+def consulta_contexto(assunto):
+    # O assunto entra duas vezes para pesar mais que perfil e competência no ranqueamento.
+    return f"{assunto} {assunto} {st.session_state.perfil} {st.session_state.competencia}"
+
+@st.cache_data(max_entries=32, show_spinner=False)
+def extrair_texto_memo(digest, tipo, limite, _dados):
+    """Extrai o texto uma única vez por conteúdo e limite: memória (limitada) → disco → PDF/DOCX.
+
+    Falhas de leitura são propagadas (e não memorizadas): um novo envio do mesmo arquivo tenta de novo.
+    """
+    cache = obter_cache_uploads()
+    chave = f"texto:{digest}:{limite}"
+    with METRICAS.medir("extração (upload)") as reg:
+        txt = cache.obter(chave)
+        reg["cache_hit"] = txt is not None
+        if txt is None:
+            txt = extrair_texto(_dados, tipo, limite)
+            if txt:
+                cache.gravar(chave, txt)
+    return txt
+
+def extrair_texto_upload(digest, tipo, limite, dados):
     try:
-        if upload.type == "application/pdf":
-            reader = PyPDF2.PdfReader(BytesIO(upload.read()))
-            return "".join(p.extract_text() or "" for p in reader.pages)
-        elif upload.type == "application/vnd.openxmlformats-officedocument.wordprocessingml.document":
-            doc = Document(BytesIO(upload.read()))
-            return "\n".join(p.text for p in doc.paragraphs)
-        return None
+        return extrair_texto_memo(digest, tipo, limite, dados)
     except Exception as e:
         st.error(f"Erro ao ler o arquivo: {e}")
         return None
 
-def search_articles(query, num=5, search_type='web'):
+def _usar_texto_colado():
+    st.session_state.text_base = st.session_state.tb_colar
+    st.session_state.ref_final = st.session_state.get("ref_colar", "")
+    st.session_state.upload_processado = None
+
+def buscar_noticias(query):
     try:
-        headers = {"User-Agent": "Mozilla/5.0", "Accept-Language": "pt-BR,pt;q=0.9"}
-        params = {"q": query, "hl": "pt-BR", "gl": "br", "num": num}
-        if search_type == 'news':
-            params['tbm'] = 'nws' 
-        r = requests.get("https://www.google.com/search", headers=headers, params=params, timeout=10)
-        r.raise_for_status()
-        soup = BeautifulSoup(r.text, "html.parser")
-        results = []
-        # --- SELETORES ATUALIZADOS PARA BUSCA DE NOTÍCIAS (NOV/2023) ---
-        # Google pode alterar esses seletores a qualquer momento.
-        for block in soup.select("a.WlydOe, a.JtKRv, a.DY5T1d"):
-            title_element = block.find("div", role="heading")
-            if title_element:
-                 results.append({"title": title_element.get_text(), "url": block['href']})
-            if len(results) >= num: break
-        return results
+        return search_articles(query, search_type='news')
     except Exception as e:
         st.error(f"Erro na busca: {e}")
         return []
 
-def chamar_llm(prompts, prov, mdl, temperature=0.7, max_tokens=2000):
+def chamar_llm(prompts, prov, mdl, temperature=0.7, max_tokens=2000, usar_cache=True, formato_json=False, etapa="llm"):
     try:
-        if prov.startswith("OpenAI"):
-            client = OpenAI(api_key=st.session_state.api_key)
-            r = client.chat.completions.create(model=mdl, messages=prompts, temperature=temperature, max_tokens=max_tokens, response_format={"type": "text"})
-            return r.choices[0].message.content.strip()
-        else:
-            genai.configure(api_key=st.session_state.api_key)
-            cfg = genai.GenerationConfig(temperature=temperature, max_output_tokens=max_tokens, response_mime_type="text/plain")
-            m = genai.GenerativeModel(mdl)
-            prompt_text = "\n".join(f"**{m['role']}**: {m['content']}" for m in prompts)
-            resp = m.generate_content(prompt_text, generation_config=cfg)
-            return resp.text
+        return gerar_resposta(prompts, prov, mdl, st.session_state.api_key, temperature, max_tokens,
+                              cache=obter_cache_llm(), usar_cache=usar_cache, formato_json=formato_json, etapa=etapa)
     except Exception as e:
         st.error(f"Erro ao chamar a API: {e}")
         return None
 
+def chamar_llm_stream(prompts, prov, mdl, temperature=0.7, max_tokens=2000, usar_cache=True, etapa="llm"):
+    """Como `chamar_llm`, mas exibe a resposta progressivamente enquanto ela chega; o espaço é limpo ao final."""
+    area_stream = st.empty()
+    try:
+        with area_stream.container(border=True):
+            resp = st.write_stream(gerar_resposta_stream(prompts, prov, mdl, st.session_state.api_key, temperature, max_tokens,
+                                                         cache=obter_cache_llm(), usar_cache=usar_cache, etapa=etapa))
+        return resp.strip() if isinstance(resp, str) else None
+    except Exception as e:
+        st.error(f"Erro ao chamar a API: {e}")
+        return None
+    finally:
+        area_stream.empty()
+
+def gerar_questao_estruturada(prompts, prov, mdl, usar_cache=True):
+    resposta = chamar_llm(prompts, prov, mdl, usar_cache=usar_cache, formato_json=True, etapa="geração")
+    if not resposta:
+        return None
+    try:
+        return Questao.da_resposta(resposta, st.session_state.text_base, st.session_state.ref_final)
+    except ValueError as e:
+        st.error(f"A resposta da IA não está no formato esperado: {e}")
+        return None
+
+def refinar_estrutura(estrutura, prompts, campos, prov, mdl, usar_cache=True):
+    """Pede à IA só os `campos` afetados pelo refinamento e os aplica sobre a questão estruturada."""
+    resposta = chamar_llm(prompts, prov, mdl, usar_cache=usar_cache, formato_json=True, etapa="refinamento")
+    if not resposta:
+        return None
+    try:
+        return estrutura.com_resposta(resposta, campos)
+    except ValueError as e:
+        st.error(f"A resposta da IA não está no formato esperado: {e}")
+        return None
+
 # --- LAYOUT PRINCIPAL ---
 st.title("🎓 Gerador de Questões ENADE v3.5")
 st.markdown("Bem-vindo ao gerador interativo. Siga os passos para criar, analisar e refinar suas questões.")
@@ -150,16 +259,10 @@ with col_input:
         curso = c2.selectbox("Curso", AREAS_ENADE[area])
         assunto = st.text_input("Assunto central", "")
         
-        tipos_questao = {
-            "Múltipla Escolha Tradicional": "Enunciado com 5 alternativas (A, B, C, D, E), sendo apenas uma correta.",
-            "Complementação": "Frase com uma ou mais lacunas (___) que devem ser preenchidas por uma das alternativas.",
-            "Afirmação-Razão": "Duas asserções (I e II) ligadas por 'PORQUE'. O aluno avalia a veracidade de ambas e a relação entre elas.",
-            "Resposta Múltipla": "Apresenta várias afirmativas (I, II, III...). O aluno deve selecionar a alternativa que indica quais estão corretas."
-        }
         question_type = st.selectbox(
             "Tipo de questão", 
-            options=list(tipos_questao.keys()),
-            format_func=lambda k: f"{k}: {tipos_questao[k]}"
+            options=list(TIPOS_QUESTAO.keys()),
+            format_func=lambda k: f"{k}: {TIPOS_QUESTAO[k]}"
         )
 
     with st.container(border=True):
@@ -175,39 +278,60 @@ with col_input:
             if st.session_state.perfil and st.session_state.competencia and assunto:
                 if st.button("Gerar Contextualização com IA", use_container_width=True):
                     with st.spinner("A IA está criando um texto-base contextualizado..."):
-                        prompt_contexto = [
-                            {"role": "system", "content": f"Você é um docente especialista do curso de {curso} que cria textos-base para questões do ENADE. Os textos devem ser contextualizados, apresentar uma situação-problema e ser perfeitamente alinhados às diretrizes pedagógicas."},
-                            {"role": "user", "content": f"Elabore um texto-base (entre 150 e 250 palavras) para uma questão do ENADE sobre '{assunto}'. O texto deve ser uma situação-problema voltada a um egresso com o perfil: '{st.session_state.perfil}'. A avaliação focará na competência: '{st.session_state.competencia}'. O texto deve ser técnico e denso. Não inclua enunciado ou alternativas, apenas o texto-base."}
-                        ]
-                        tb = chamar_llm(prompt_contexto, provedor, modelo, temperature=0.6, max_tokens=400)
+                        prompt_contexto = prompt_texto_base(curso, assunto, st.session_state.perfil, st.session_state.competencia)
+                        tb = chamar_llm_stream(prompt_contexto, provedor, modelo, temperature=0.6, max_tokens=400, usar_cache=usar_cache, etapa="texto-base")
                         if tb:
                             st.session_state.text_base = tb
-                            st.session_state.ref_final = "Texto gerado por IA."
+                            st.session_state.ref_final = REF_GERADA_IA
                             st.success("Texto-base gerado!")
             else:
                 st.warning("Preencha o Assunto, Perfil e Competência para gerar o texto-base.")
         else:
             tab_colar, tab_upload, tab_busca = st.tabs(["Colar Texto", "Upload de Arquivo (PDF/DOCX)", "Busca na Web"])
             with tab_colar:
-                st.session_state.text_base = st.text_area("Cole o texto-base aqui:", height=150, key="tb_colar")
-                st.session_state.ref_final = st.text_input("Referência ABNT do texto colado (se aplicável):", key="ref_colar")
+                st.text_area("Cole o texto-base aqui:", height=150, key="tb_colar", on_change=_usar_texto_colado)
+                st.text_input("Referência ABNT do texto colado (se aplicável):", key="ref_colar", on_change=_usar_texto_colado)
             with tab_upload:
                 up = st.file_uploader("Envie um arquivo PDF ou DOCX", type=['pdf', 'docx'])
-                if up:
-                    with st.spinner("Extraindo e resumindo o conteúdo do arquivo..."):
-                        txt_extraido = extrair_texto_upload(up)
-                        if txt_extraido:
-                            prompt_resumo = [
-                                {"role": "system", "content": "Você é um especialista em resumir textos para serem usados como base em questões do ENADE."},
-                                {"role": "user", "content": f"Resuma o texto a seguir em um parágrafo coeso de até 200 palavras, focando nos pontos essenciais para uma questão sobre '{assunto}' no curso de {curso}.\n\nTEXTO:\n{txt_extraido[:4000]}"}
-                            ]
-                            st.session_state.text_base = chamar_llm(prompt_resumo, provedor, modelo, temperature=0.4)
-                            st.session_state.ref_final = f"Texto adaptado de '{up.name}'."
-                            st.success("Arquivo processado e resumido!")
+                doc_completo = st.checkbox("Resumir o documento completo", value=False, help="Resume todas as partes do arquivo em paralelo e combina os resumos. Sem esta opção, são usadas as passagens mais relevantes das primeiras páginas.")
+                if not up:
+                    st.session_state.upload_processado = None
+                else:
+                    dados = up.getvalue()
+                    digest = hashlib.sha256(dados).hexdigest()
+                    chave_upload = hashlib.sha256(f"{digest}|{consulta_contexto(assunto)}|{curso}|{provedor}|{modelo}|{doc_completo}".encode("utf-8")).hexdigest()
+                    # Só processa quando o arquivo ou a encomenda (assunto, perfil, competência, curso) mudam; reruns comuns não refazem nada.
+                    if st.session_state.upload_processado != chave_upload:
+                        with st.spinner("Extraindo e resumindo o conteúdo do arquivo..."):
+                            resumo = obter_cache_uploads().obter(f"resumo:{chave_upload}") if usar_cache else None
+                            if resumo is None:
+                                # No modo padrão a leitura para no limite: PDFs longos não são extraídos por inteiro.
+                                txt_extraido = extrair_texto_upload(digest, up.type, None if doc_completo else LIMITE_LEITURA_UPLOAD, dados)
+                                if txt_extraido and doc_completo:
+                                    try:
+                                        resumos = resumir_blocos(txt_extraido, assunto, curso, provedor, modelo, st.session_state.api_key,
+                                                                 cache=obter_cache_llm(), usar_cache=usar_cache)
+                                    except Exception as e:
+                                        st.error(f"Erro ao chamar a API: {e}")
+                                        resumos = []
+                                    if resumos:
+                                        resumo = chamar_llm_stream(prompt_fusao_resumos(resumos, assunto, curso), provedor, modelo, temperature=0.4, usar_cache=usar_cache, etapa="resumo (upload)")
+                                elif txt_extraido:
+                                    contexto_sel = selecionar_contexto(txt_extraido, consulta_contexto(assunto), orcamento_contexto(modelo))
+                                    resumo = chamar_llm_stream(prompt_resumo_upload(contexto_sel, assunto, curso), provedor, modelo, temperature=0.4, usar_cache=usar_cache, etapa="resumo (upload)")
+                                if resumo:
+                                    obter_cache_uploads().gravar(f"resumo:{chave_upload}", resumo)
+                            if resumo:
+                                st.session_state.text_base = resumo
+                                st.session_state.ref_final = f"Texto adaptado de '{up.name}'."
+                                st.session_state.upload_processado = chave_upload
+                                st.success("Arquivo processado e resumido!")
             with tab_busca:
                 if st.button("📰 Buscar Notícias", use_container_width=True, key="search_news_btn"):
                     with st.spinner(f"Buscando notícias sobre '{assunto}'..."):
-                        st.session_state.search_results = search_articles(f'"{assunto}"', search_type='news')
+                        st.session_state.search_results = buscar_noticias(f'"{assunto}"')
+                        # Os artigos já começam a ser baixados enquanto o usuário escolhe um deles.
+                        st.session_state.prefetch = prefetch_artigos([r["url"] for r in st.session_state.search_results], obter_cache_web())
                         if not st.session_state.search_results:
                             st.warning("Nenhuma notícia encontrada com os seletores atuais.")
                 if st.session_state.search_results:
@@ -216,13 +340,11 @@ with col_input:
                     if st.button("▶️ Usar este conteúdo", key="use_search_btn"):
                         art = st.session_state.search_results[sel_idx]
                         with st.spinner(f"Extraindo e resumindo '{art['title']}'..."):
-                            cont, tit, aut = extrair_conteudo_url(art["url"])
+                            futuro = st.session_state.prefetch.get(art["url"])
+                            cont, tit, aut = futuro.result() if futuro else extrair_conteudo_url(art["url"], obter_cache_web())
                             if cont:
-                                prompt_resumo_web = [
-                                    {"role": "system", "content": "Você resume conteúdos da web para serem usados como base em questões do ENADE."},
-                                    {"role": "user", "content": f"Resuma o conteúdo a seguir em um parágrafo (até 200 palavras) que sirva como situação-problema sobre '{assunto}'.\n\nConteúdo:\n{cont[:4000]}"}
-                                ]
-                                st.session_state.text_base = chamar_llm(prompt_resumo_web, provedor, modelo, temperature=0.4)
+                                contexto_sel = selecionar_contexto(cont, consulta_contexto(assunto), orcamento_contexto(modelo))
+                                st.session_state.text_base = chamar_llm_stream(prompt_resumo_web(contexto_sel, assunto), provedor, modelo, temperature=0.4, usar_cache=usar_cache, etapa="resumo (web)")
                                 st.session_state.fonte_info = {"titulo": tit, "autor": aut, "veiculo": art["url"].split("/")[2], "link": art["url"]}
                                 hoje = datetime.now()
                                 meses = ["jan.","fev.","mar.","abr.","mai.","jun.","jul.","ago.","set.","out.","nov.","dez."]
@@ -236,6 +358,8 @@ with col_input:
         with st.form("frm_gerar"):
             niv = st.select_slider("Nível Bloom", options=BLOOM_LEVELS, value="Analisar")
             dificuldade = st.slider("Nível de dificuldade", 1, 5, 3)
+            nova_variacao = st.checkbox("Gerar nova variação (ignorar cache)", value=False, help="Marque para obter uma questão diferente mesmo com os mesmos parâmetros.")
+            evitar_duplicatas = st.checkbox("Regenerar automaticamente se for quase idêntica a uma questão do banco", value=True)
             gerar = st.form_submit_button("🚀 Gerar Nova Questão", use_container_width=True, type="primary")
 
             if gerar:
@@ -243,106 +367,116 @@ with col_input:
                     st.error("É necessário ter um Texto-Base para gerar a questão.")
                 else:
                     with st.spinner("Gerando questão e análise de qualidade..."):
-                        # --- LÓGICA DE PROMPT DINÂMICO ---
-                        instrucoes_por_tipo = {
-                            "Múltipla Escolha Tradicional": "Gere um enunciado e 5 alternativas (A, B, C, D, E), onde apenas uma é correta. Forneça o gabarito e as justificativas para todas as 5 alternativas.",
-                            "Afirmação-Razão": "Gere duas asserções (I e II) ligadas pela palavra 'PORQUE'. As alternativas devem seguir o modelo padrão do ENADE para este tipo de questão (A. As duas são verdadeiras e a II justifica a I; B. As duas são verdadeiras, mas a II não justifica a I; etc.). Forneça o gabarito e uma justificativa detalhada para a resposta correta.",
-                            "Resposta Múltipla": "Gere 3 ou 4 afirmativas numeradas com algarismos romanos (I, II, III, IV). As alternativas de A a E devem ser combinações que avaliam quais afirmativas estão corretas (Ex: A. Apenas I está correta. B. Apenas I e III estão corretas. etc.).",
-                            "Complementação": "Gere um enunciado com uma ou mais lacunas indicadas por '________'. As alternativas (A a E) devem conter os termos que preenchem as lacunas de forma correta e coerente. Apenas uma alternativa deve estar totalmente correta."
-                        }
-                        
-                        instrucao_especifica = instrucoes_por_tipo[question_type]
-
-                        sys_p_geracao = f"""
-                        Você é um docente especialista em produzir questões no estilo ENADE.
-                        A partir do TEXTO-BASE e da REFERÊNCIA que serão fornecidos, sua tarefa é criar **apenas** o conteúdo da questão (ENUNCIADO, ALTERNATIVAS, GABARITO, JUSTIFICATIVAS), seguindo a regra específica para o tipo de questão solicitado.
-                        
-                        REGRAS GERAIS:
-                        - A questão deve ser inédita e alinhada à encomenda.
-                        - O enunciado deve ser claro e afirmativo. Proibido pedir a 'incorreta'.
-                        - **NÃO** inclua o TEXTO-BASE ou a REFERÊNCIA na sua resposta. Gere apenas o conteúdo da questão.
-                        - As alternativas poderiam ser ligeiramente reformuladas para evitar que a resposta correta seja facilmente identificada apenas pela eliminação das alternativas claramente incorretas. Isto é, a alternativa incorreta deve apresentar um argumento sutilmente plausível, mas ainda incorreto.
-                        
-                        REGRA ESPECÍFICA PARA O TIPO DE QUESTÃO '{question_type}':
-                        {instrucao_especifica}
-                        """
-                        usr_p_geracao = f"""
-                        GERAR CONTEÚDO DA QUESTÃO ENADE:
-                        - Área: {area}, Curso: {curso}, Assunto: {assunto}
-                        - Perfil: {st.session_state.perfil}, Competência: {st.session_state.competencia}
-                        - Tipo: {question_type}, Dificuldade: {dificuldade}/5, Nível Bloom: {niv}
-                        ---
-                        TEXTO-BASE PARA SUA ANÁLISE (NÃO COPIAR NA RESPOSTA):
-                        {st.session_state.text_base}
-                        REFERÊNCIA (NÃO COPIAR NA RESPOSTA):
-                        {st.session_state.ref_final}
-                        """
-                        questao_parcial = chamar_llm([{"role": "system", "content": sys_p_geracao}, {"role": "user", "content": usr_p_geracao}], provedor, modelo)
-
-                        if questao_parcial:
-                            ref_formatada = f"Referência: {st.session_state.ref_final}\n\n" if st.session_state.ref_final and "gerado por IA" not in st.session_state.ref_final else ""
-                            questao_completa = f"TEXTO-BASE\n\n{st.session_state.text_base}\n\n{ref_formatada}{questao_parcial}"
-
-                            sys_p_analise = "Você é um avaliador de itens do ENADE..." # Prompt de análise
-                            analise_qualidade = chamar_llm([{"role": "system", "content": sys_p_analise}, {"role": "user", "content": questao_completa}], provedor, modelo, temperature=0.3)
+                        prompts_geracao = prompt_geracao(area, curso, assunto, st.session_state.perfil, st.session_state.competencia,
+                                                         question_type, dificuldade, niv, st.session_state.text_base, st.session_state.ref_final)
+                        questao = gerar_questao_estruturada(prompts_geracao, provedor, modelo, usar_cache=usar_cache and not nova_variacao)
+
+                        if questao:
+                            questao_completa = questao.texto_completo()
+                            sig = assinatura(texto_para_indice(questao_completa, st.session_state.text_base))
+                            duplicata = buscar_duplicata(sig)
+                            tentativas = 0
+                            while duplicata and evitar_duplicatas and tentativas < MAX_REGENERACOES_DUPLICATA:
+                                tentativas += 1
+                                existente = obter_banco().obter(duplicata[0])
+                                st.info(f"Questão {duplicata[1]:.0%} parecida com '{existente['titulo']}'. Gerando outra ({tentativas}/{MAX_REGENERACOES_DUPLICATA})...")
+                                nova = gerar_questao_estruturada(prompt_geracao_distinta(prompts_geracao, texto_para_indice(existente["texto_completo"], existente["contexto"].get("texto_base", ""))),
+                                                                 provedor, modelo, usar_cache=False)
+                                if not nova:
+                                    break
+                                questao = nova
+                                questao_completa = questao.texto_completo()
+                                sig = assinatura(texto_para_indice(questao_completa, st.session_state.text_base))
+                                duplicata = buscar_duplicata(sig)
+                            if duplicata:
+                                st.toast(f"A questão gerada é {duplicata[1]:.0%} parecida com a Q{duplicata[0]} do banco.", icon="⚠️")
+                            analise_qualidade = chamar_llm(prompt_analise(questao_completa), provedor, modelo, temperature=0.3, usar_cache=usar_cache, etapa="análise")
 
                             if analise_qualidade:
                                 novo_item = {
-                                    "titulo": f"Q{len(st.session_state.questoes_geradas) + 1}: {curso} - {assunto[:25]}...",
+                                    "titulo": f"{curso} - {assunto[:25]}...",
                                     "texto_completo": questao_completa,
                                     "analise_qualidade": analise_qualidade,
-                                    "contexto": {"area": area, "curso": curso, "assunto": assunto, "perfil": st.session_state.perfil, "competencia": st.session_state.competencia, "texto_base": st.session_state.text_base}
+                                    "estrutura": questao.para_dict(),
+                                    "contexto": {"area": area, "curso": curso, "assunto": assunto, "perfil": st.session_state.perfil, "competencia": st.session_state.competencia, "texto_base": st.session_state.text_base,
+                                                 "tipo": question_type, "dificuldade": dificuldade, "nivel_bloom": niv}
                                 }
-                                st.session_state.questoes_geradas.append(novo_item)
-                                st.session_state.selected_index = len(st.session_state.questoes_geradas) - 1
+                                st.session_state.selected_id = obter_banco().inserir(novo_item, sig.tobytes())
+                                obter_indice_duplicatas().adicionar(st.session_state.selected_id, sig)
+                                st.session_state.pagina_historico = 1
                                 st.success("Questão e análise geradas!")
                                 st.rerun()
 
 with col_output:
     st.header("2. Análise e Refinamento")
 
-    if not st.session_state.questoes_geradas:
+    q_selecionada = obter_banco().obter(st.session_state.selected_id) if st.session_state.selected_id else None
+    if not q_selecionada:
         st.info("A questão gerada, junto com sua análise de qualidade e opções de refinamento, aparecerá aqui.")
     else:
-        # Lógica de display e refinamento (sem alterações)
-        q_selecionada = st.session_state.questoes_geradas[st.session_state.selected_index]
+        qid = q_selecionada["id"]
         st.subheader(f"Visualizando: {q_selecionada['titulo']}")
         tab_view, tab_analise, tab_refino = st.tabs(["📝 Questão", "🔍 Análise de Qualidade (IA)", "✨ Refinamento Iterativo (IA)"])
         with tab_view:
-            st.text_area("Texto da Questão", value=q_selecionada["texto_completo"], height=500, key=f"q_view_{st.session_state.selected_index}")
-            c1, c2 = st.columns(2)
-            c1.download_button("📄 Baixar esta questão (.txt)", q_selecionada["texto_completo"], f"{q_selecionada['titulo']}.txt", use_container_width=True)
-            df_all = pd.DataFrame([{"titulo": q["titulo"], "questao": q["texto_completo"], "analise": q["analise_qualidade"]} for q in st.session_state.questoes_geradas])
-            to_xl = BytesIO()
-            df_all.to_excel(to_xl, index=False, sheet_name="Questões")
-            to_xl.seek(0)
-            c2.download_button("📥 Baixar todas (.xlsx)", to_xl, "banco_completo_enade.xlsx", use_container_width=True)
+            st.text_area("Texto da Questão", value=q_selecionada["texto_completo"], height=500, key=f"q_view_{qid}_{hash(q_selecionada['texto_completo'])}")
+            st.download_button("📄 Baixar esta questão (.txt)", q_selecionada["texto_completo"], f"{q_selecionada['titulo']}.txt")
+            versoes = obter_banco().versoes(qid)
+            if len(versoes) > 1:
+                with st.expander(f"🕘 Versões anteriores ({len(versoes) - 1})"):
+                    for v in versoes[1:]:
+                        st.caption(f"{v['criado_em']} · {v['acao']}")
+                        st.text(v["texto_completo"])
         with tab_analise:
             st.info("Esta análise foi gerada por uma IA especialista para ajudar na validação da questão.")
             st.markdown(q_selecionada["analise_qualidade"])
         with tab_refino:
-            st.warning("Ações de refinamento modificarão a questão atual. A versão original será perdida.")
+            st.warning("Ações de refinamento modificarão a questão atual. As versões anteriores ficam salvas no histórico da questão.")
             r_c1, r_c2, r_c3 = st.columns(3)
-            if r_c1.button("🤔 Tornar Mais Difícil", use_container_width=True, key=f"b_dificil_{st.session_state.selected_index}"):
+            texto_base_q = q_selecionada["contexto"].get("texto_base", "")
+            # Questões estruturadas enviam e recebem só a parte afetada; as antigas (texto livre) seguem reescritas por inteiro.
+            estrutura = Questao.de_dict(q_selecionada["estrutura"]) if q_selecionada["estrutura"] else None
+            if r_c1.button("🤔 Tornar Mais Difícil", use_container_width=True, key=f"b_dificil_{qid}"):
                 with st.spinner("Refinando..."):
-                    prompt_refino = f"Reescreva a questão a seguir para torná-la significativamente mais difícil...\n\nQUESTÃO ATUAL:\n{q_selecionada['texto_completo']}"
-                    texto_refinado = chamar_llm([{"role": "user", "content": prompt_refino}], provedor, modelo)
-                    st.session_state.questoes_geradas[st.session_state.selected_index]["texto_completo"] = texto_refinado
-                    st.rerun()
-            if r_c2.button("✍️ Simplificar o Enunciado", use_container_width=True, key=f"b_simplificar_{st.session_state.selected_index}"):
+                    if estrutura:
+                        nova = refinar_estrutura(estrutura, prompt_refino_dificuldade(estrutura), Questao.CAMPOS_QUESTAO, provedor, modelo, usar_cache)
+                        texto_refinado = nova.texto_completo() if nova else None
+                    else:
+                        nova = None
+                        prompt_refino = f"Reescreva a questão a seguir para torná-la significativamente mais difícil...\n\nQUESTÃO ATUAL:\n{q_selecionada['texto_completo']}"
+                        texto_refinado = chamar_llm_stream([{"role": "user", "content": prompt_refino}], provedor, modelo, usar_cache=usar_cache, etapa="refinamento")
+                    if texto_refinado:
+                        salvar_refinamento(qid, texto_refinado, "Tornar Mais Difícil", texto_base_q, nova)
+                        st.rerun()
+            if r_c2.button("✍️ Simplificar o Enunciado", use_container_width=True, key=f"b_simplificar_{qid}"):
                 with st.spinner("Refinando..."):
-                     prompt_refino = f"Reescreva apenas o ENUNCIADO da questão a seguir...\n\nQUESTÃO ATUAL:\n{q_selecionada['texto_completo']}"
-                     texto_refinado = chamar_llm([{"role": "user", "content": prompt_refino}], provedor, modelo)
-                     st.session_state.questoes_geradas[st.session_state.selected_index]["texto_completo"] = texto_refinado
-                     st.rerun()
-            if r_c3.button("🔄 Regenerar Alternativas", use_container_width=True, key=f"b_alternativas_{st.session_state.selected_index}"):
+                    if estrutura:
+                        enunciado = chamar_llm_stream(prompt_refino_enunciado(estrutura), provedor, modelo, usar_cache=usar_cache, etapa="refinamento")
+                        nova = replace(estrutura, enunciado=enunciado) if enunciado else None
+                        texto_refinado = nova.texto_completo() if nova else None
+                    else:
+                        nova = None
+                        prompt_refino = f"Reescreva apenas o ENUNCIADO da questão a seguir...\n\nQUESTÃO ATUAL:\n{q_selecionada['texto_completo']}"
+                        texto_refinado = chamar_llm_stream([{"role": "user", "content": prompt_refino}], provedor, modelo, usar_cache=usar_cache, etapa="refinamento")
+                    if texto_refinado:
+                        salvar_refinamento(qid, texto_refinado, "Simplificar o Enunciado", texto_base_q, nova)
+                        st.rerun()
+            if r_c3.button("🔄 Regenerar Alternativas", use_container_width=True, key=f"b_alternativas_{qid}"):
                 with st.spinner("Refinando..."):
-                    prompt_refino = f"Mantenha o TEXTO-BASE e o ENUNCIADO da questão a seguir, mas gere um conjunto completamente novo de ALTERNATIVAS...\n\nQUESTÃO ATUAL:\n{q_selecionada['texto_completo']}"
-                    texto_refinado = chamar_llm([{"role": "user", "content": prompt_refino}], provedor, modelo)
-                    st.session_state.questoes_geradas[st.session_state.selected_index]["texto_completo"] = texto_refinado
-                    st.rerun()
+                    if estrutura:
+                        nova = refinar_estrutura(estrutura, prompt_refino_alternativas(estrutura, q_selecionada["tipo"]), ("alternativas", "gabarito", "justificativas"),
+                                                 provedor, modelo, usar_cache)
+                        texto_refinado = nova.texto_completo() if nova else None
+                    else:
+                        nova = None
+                        prompt_refino = f"Mantenha o TEXTO-BASE e o ENUNCIADO da questão a seguir, mas gere um conjunto completamente novo de ALTERNATIVAS...\n\nQUESTÃO ATUAL:\n{q_selecionada['texto_completo']}"
+                        texto_refinado = chamar_llm_stream([{"role": "user", "content": prompt_refino}], provedor, modelo, usar_cache=usar_cache, etapa="refinamento")
+                    if texto_refinado:
+                        salvar_refinamento(qid, texto_refinado, "Regenerar Alternativas", texto_base_q, nova)
+                        st.rerun()
 
 if st.sidebar.button("🔴 Encerrar e Limpar Sessão", use_container_width=True):
+    if st.session_state.exportacao and os.path.exists(st.session_state.exportacao["arquivo"]):
+        os.remove(st.session_state.exportacao["arquivo"])
     keys_to_clear = list(st.session_state.keys())
     for key in keys_to_clear:
         del st.session_state[key]